@@ -26,24 +26,1074 @@ Generate debops-keyring rst documentation from files in the debian-keyring forma
 """
 
 try:
-    from tempfile import TemporaryDirectory
+    from tempfile import TemporaryDirectory, NamedTemporaryFile
 except ImportError:
     raise Exception("debops.keyring requires Python3. Python2 is currently not supported.")
 
 import os
 import re
+import base64
+import hashlib
+import shutil
 import logging
 import pprint
+import json
 from datetime import datetime
-from subprocess import check_output
+from subprocess import check_output, DEVNULL
 import time
 import textwrap
+import bisect
+from collections import deque
 
 import jinja2
 from gnupg import GPG
 import git
 
 
+def _parse_gpg_colons(gpg_stdout):
+    """
+    Parse the output of :command:`gpg --with-colons --fixed-list-mode` into
+    a list of public keys.
+    Refer to :file:`doc/DETAILS` in the GnuPG sources for the format.
+    """
+    keys = []
+    current_key = None
+    current_item = None
+    current_uid = None
+    in_user_id = False
+    for line in gpg_stdout.split('\n'):
+        fields = line.split(':')
+        record_type = fields[0]
+        if record_type in ['pub', 'sub']:
+            current_item = {
+                'length': int(fields[2]),
+                'algo': int(fields[3]),
+                'keyid': fields[4],
+                'created': int(fields[5]) if fields[5] else None,
+                'expires': int(fields[6]) if fields[6] else None,
+                # Upper case letters are the capabilities of the whole key
+                # and are only shown when the key is usable.
+                'capabilities': ''.join([x for x in fields[11] if x.islower()]),
+                'revoked': fields[1] == 'r',
+                'fingerprint': None,
+            }
+            if record_type == 'pub':
+                current_item.update({'uids': [], 'sigs': [], 'subkeys': []})
+                current_key = current_item
+                keys.append(current_key)
+            else:
+                current_key['subkeys'].append(current_item)
+            in_user_id = False
+        elif record_type == 'fpr' and current_item is not None and current_item['fingerprint'] is None:
+            current_item['fingerprint'] = fields[9]
+        elif record_type in ['uid', 'uat'] and current_key is not None:
+            if record_type == 'uid':
+                current_key['uids'].append(fields[9])
+            current_uid = fields[9] if record_type == 'uid' else None
+            current_item = current_key
+            in_user_id = True
+        elif record_type in ['sig', 'rev'] and current_key is not None and in_user_id:
+            # Only signatures over UIDs. Subkey binding signatures are listed
+            # after the `sub` record. The validity is only known for
+            # :command:`gpg --check-sigs`.
+            current_key['sigs'].append({
+                'keyid': fields[4],
+                'created': int(fields[5]) if fields[5] else None,
+                # The reason for revocation is appended for `rev` records.
+                'sig_class': fields[10].split(',')[0],
+                'validity': fields[1],
+                'uid': current_uid,
+            })
+    return keys
+
+
+def _dearmor_openpgp(data):
+    """
+    Return the binary OpenPGP data from ASCII armored blocks in `data`.
+    Binary data is returned unchanged.
+    """
+    if b'-----BEGIN PGP ' not in data:
+        return data
+    binary_data = b''
+    in_block = False
+    in_headers = False
+    base64_lines = []
+    for line in data.splitlines():
+        line = line.strip()
+        if line.startswith(b'-----BEGIN PGP '):
+            in_block = True
+            in_headers = True
+            base64_lines = []
+        elif line.startswith(b'-----END PGP '):
+            binary_data += base64.b64decode(b''.join(base64_lines))
+            in_block = False
+        elif in_block and in_headers:
+            if line == b'':
+                in_headers = False
+            elif b':' not in line:
+                # Armor without any headers and without separating empty line.
+                in_headers = False
+                base64_lines.append(line)
+        elif in_block and not line.startswith(b'='):
+            base64_lines.append(line)
+    return binary_data
+
+
+def _iter_openpgp_packets(data):
+    """
+    Yield (tag, body) tuples for the OpenPGP packets in binary `data`.
+    """
+    pos = 0
+    while pos < len(data):
+        ctb = data[pos]
+        if not ctb & 0x80:
+            raise Exception("Invalid OpenPGP packet header at offset {}.".format(pos))
+        if ctb & 0x40:
+            tag = ctb & 0x3f
+            pos += 1
+            body = b''
+            while True:
+                first_octet = data[pos]
+                if first_octet < 192:
+                    (length, pos) = (first_octet, pos + 1)
+                elif first_octet < 224:
+                    (length, pos) = (((first_octet - 192) << 8) + data[pos + 1] + 192, pos + 2)
+                elif first_octet == 255:
+                    (length, pos) = (int.from_bytes(data[pos + 1:pos + 5], 'big'), pos + 5)
+                else:
+                    # Partial body length.
+                    partial_length = 1 << (first_octet & 0x1f)
+                    body += data[pos + 1:pos + 1 + partial_length]
+                    pos += 1 + partial_length
+                    continue
+                body += data[pos:pos + length]
+                pos += length
+                break
+        else:
+            tag = (ctb >> 2) & 0x0f
+            length_type = ctb & 0x03
+            if length_type == 3:
+                (length, pos) = (len(data) - pos - 1, pos + 1)
+            else:
+                length_size = 1 << length_type
+                length = int.from_bytes(data[pos + 1:pos + 1 + length_size], 'big')
+                pos += 1 + length_size
+            body = data[pos:pos + length]
+            pos += length
+        yield (tag, body)
+
+
+def _read_mpi(data, pos):
+    bit_length = int.from_bytes(data[pos:pos + 2], 'big')
+    byte_length = (bit_length + 7) // 8
+    return (int.from_bytes(data[pos + 2:pos + 2 + byte_length], 'big'), pos + 2 + byte_length)
+
+
+_OPENPGP_CURVE_BITS = {
+    # ASN.1 OIDs as used in OpenPGP packets mapped to the key size as
+    # reported by GnuPG.
+    bytes.fromhex('2a8648ce3d030107'): 256,  # NIST P-256
+    bytes.fromhex('2b81040022'): 384,  # NIST P-384
+    bytes.fromhex('2b81040023'): 521,  # NIST P-521
+    bytes.fromhex('2b2403030208010107'): 256,  # brainpoolP256r1
+    bytes.fromhex('2b240303020801010b'): 384,  # brainpoolP384r1
+    bytes.fromhex('2b240303020801010d'): 512,  # brainpoolP512r1
+    bytes.fromhex('2b06010401da470f01'): 255,  # Ed25519
+    bytes.fromhex('2b060104019755010501'): 255,  # Curve25519
+}
+
+
+def _parse_openpgp_public_key(body):
+    """
+    Parse a v4 public key or public subkey packet body.
+    """
+    if body[0] != 4:
+        raise Exception("Only OpenPGP v4 keys are supported, got v{}.".format(body[0]))
+    fingerprint = hashlib.sha1(b'\x99' + len(body).to_bytes(2, 'big') + body).hexdigest().upper()
+    algo = body[5]
+    pos = 6
+    material = {}
+    if algo in [1, 2, 3]:
+        (material['n'], pos) = _read_mpi(body, pos)
+        (material['e'], pos) = _read_mpi(body, pos)
+        length = material['n'].bit_length()
+    elif algo in [16, 17]:
+        (material['p'], pos) = _read_mpi(body, pos)
+        length = material['p'].bit_length()
+    elif algo in [18, 19, 22]:
+        oid = body[pos + 1:pos + 1 + body[pos]]
+        pos += 1 + body[pos]
+        (material['point'], pos) = _read_mpi(body, pos)
+        material['oid'] = oid
+        length = _OPENPGP_CURVE_BITS.get(oid, 0)
+    else:
+        length = 0
+    # Needed to verify signatures over the key.
+    material['packet'] = body
+    return {
+        'length': length,
+        'algo': algo,
+        'keyid': fingerprint[-16:],
+        'created': int.from_bytes(body[1:5], 'big'),
+        'expires': None,
+        'capabilities': '',
+        'revoked': False,
+        'fingerprint': fingerprint,
+        'material': material,
+    }
+
+
+def _iter_openpgp_subpackets(data):
+    pos = 0
+    while pos < len(data):
+        first_octet = data[pos]
+        if first_octet < 192:
+            (length, pos) = (first_octet, pos + 1)
+        elif first_octet < 255:
+            (length, pos) = (((first_octet - 192) << 8) + data[pos + 1] + 192, pos + 2)
+        else:
+            (length, pos) = (int.from_bytes(data[pos + 1:pos + 5], 'big'), pos + 5)
+        yield (data[pos] & 0x7f, data[pos + 1:pos + length])
+        pos += length
+
+
+def _parse_openpgp_signature(body):
+    """
+    Parse a v3 or v4 signature packet body.
+    """
+    signature = {
+        'version': body[0],
+        'key_expires': None,
+        'sig_expires': None,
+        'key_flags': None,
+        'keyid': None,
+        'embedded_signature': None,
+    }
+    if body[0] == 3:
+        signature.update({
+            'sig_type': body[2],
+            'created': int.from_bytes(body[3:7], 'big'),
+            'keyid': body[7:15].hex().upper(),
+            'pub_algo': body[15],
+            'hash_algo': body[16],
+            'hashed_data': body[2:7],
+        })
+        pos = 17
+    elif body[0] == 4:
+        hashed_length = int.from_bytes(body[4:6], 'big')
+        unhashed_pos = 6 + hashed_length
+        unhashed_length = int.from_bytes(body[unhashed_pos:unhashed_pos + 2], 'big')
+        signature.update({
+            'sig_type': body[1],
+            'created': None,
+            'pub_algo': body[2],
+            'hash_algo': body[3],
+            'hashed_data': body[:unhashed_pos],
+        })
+        for (subpacket_type, subpacket_data) in _iter_openpgp_subpackets(body[6:unhashed_pos]):
+            if subpacket_type == 2:
+                signature['created'] = int.from_bytes(subpacket_data, 'big')
+            elif subpacket_type == 3:
+                signature['sig_expires'] = int.from_bytes(subpacket_data, 'big')
+            elif subpacket_type == 9:
+                signature['key_expires'] = int.from_bytes(subpacket_data, 'big')
+            elif subpacket_type == 27:
+                signature['key_flags'] = subpacket_data[0] if subpacket_data else 0
+            elif subpacket_type == 16 and signature['keyid'] is None:
+                signature['keyid'] = subpacket_data.hex().upper()
+            elif subpacket_type == 32:
+                signature['embedded_signature'] = subpacket_data
+            elif subpacket_type == 33:
+                signature['keyid'] = subpacket_data[1:].hex().upper()[-16:]
+        for (subpacket_type, subpacket_data) in _iter_openpgp_subpackets(
+                body[unhashed_pos + 2:unhashed_pos + 2 + unhashed_length]):
+            if subpacket_type == 16 and signature['keyid'] is None:
+                signature['keyid'] = subpacket_data.hex().upper()
+            elif subpacket_type == 32:
+                signature['embedded_signature'] = subpacket_data
+        pos = unhashed_pos + 2 + unhashed_length
+    else:
+        raise Exception("Unsupported OpenPGP signature version {}.".format(body[0]))
+    signature['left16'] = body[pos:pos + 2]
+    signature['mpis'] = body[pos + 2:]
+    return signature
+
+
+def _apply_openpgp_self_signature(key, signature):
+    if signature['created'] is None:
+        return
+    if key.get('_self_sig_created') is not None and signature['created'] < key['_self_sig_created']:
+        return
+    key['_self_sig_created'] = signature['created']
+    if signature['key_expires']:
+        key['expires'] = key['created'] + signature['key_expires']
+    else:
+        key['expires'] = None
+    if signature['key_flags'] is not None:
+        key['capabilities'] = ''.join([
+            capability for (flag, capability) in PythonBackend._KEY_FLAGS_CAPABILITIES
+            if signature['key_flags'] & flag
+        ])
+
+
+def _parse_openpgp_keys(key_data):
+    """
+    Parse all transferable public keys in `key_data` into the format
+    returned by :func:`_parse_gpg_colons`.
+    Self-signatures, binding signatures and revocations are only taken into
+    account when they can be verified. Like GnuPG does on import, user IDs
+    without a valid self-signature and keys without any valid user ID are
+    dropped.
+    """
+    keys = []
+    current_key = None
+    current_item = None
+    current_uid = None
+    for (tag, body) in _iter_openpgp_packets(_dearmor_openpgp(key_data)):
+        if tag == 6:
+            current_key = _parse_openpgp_public_key(body)
+            current_key.update({'uids': [], 'sigs': [], 'subkeys': [], '_uids': []})
+            current_item = current_key
+            current_uid = None
+            keys.append(current_key)
+        elif current_key is None:
+            continue
+        elif tag == 14:
+            current_item = _parse_openpgp_public_key(body)
+            current_key['subkeys'].append(current_item)
+        elif tag in [13, 17]:
+            current_uid = {
+                'uid': body.decode('utf-8', 'replace') if tag == 13 else None,
+                'packet': body,
+                'hash_prefix': b'\xb4' if tag == 13 else b'\xd1',
+                'sigs': [],
+                'valid': False,
+            }
+            current_key['_uids'].append(current_uid)
+            current_item = current_key
+        elif tag == 2:
+            signature = _parse_openpgp_signature(body)
+            is_self_signature = signature['keyid'] == current_key['keyid']
+            key_hash_prefix = _get_openpgp_key_hash_prefix(current_key)
+            if current_item is current_key and current_uid is None:
+                if signature['sig_type'] in [0x1f, 0x20] and is_self_signature:
+                    if not _verify_openpgp_signature(current_key, signature, key_hash_prefix):
+                        continue
+                    if signature['sig_type'] == 0x1f:
+                        _apply_openpgp_self_signature(current_key, signature)
+                    else:
+                        current_key['revoked'] = True
+            elif current_item is current_key and (0x10 <= signature['sig_type'] <= 0x13 or
+                                                  signature['sig_type'] == 0x30):
+                # v3 signatures hash the user ID without prefix.
+                uid_hash_data = current_uid['packet']
+                if signature['version'] == 4:
+                    uid_hash_data = current_uid['hash_prefix'] + \
+                        len(uid_hash_data).to_bytes(4, 'big') + uid_hash_data
+                sig = {
+                    'keyid': signature['keyid'],
+                    'created': signature['created'],
+                    'sig_class': '{:02x}x'.format(signature['sig_type']),
+                    'validity': '?',
+                    'uid': current_uid['uid'],
+                }
+                current_uid['sigs'].append(sig)
+                if is_self_signature:
+                    if _verify_openpgp_signature(current_key, signature, key_hash_prefix + uid_hash_data):
+                        sig['validity'] = '!'
+                        if signature['sig_type'] != 0x30:
+                            current_uid['valid'] = True
+                            _apply_openpgp_self_signature(current_key, signature)
+                    else:
+                        sig['validity'] = '-'
+                else:
+                    # Certifications by other keys can only be checked once
+                    # the key of the signer is known, refer to
+                    # :meth:`PythonBackend.list_keys`.
+                    sig['_signature'] = signature
+                    sig['_signed_data'] = key_hash_prefix + uid_hash_data
+            elif current_item is not current_key and signature['sig_type'] in [0x18, 0x28] and is_self_signature:
+                subkey_hash_data = key_hash_prefix + _get_openpgp_key_hash_prefix(current_item)
+                if not _verify_openpgp_signature(current_key, signature, subkey_hash_data):
+                    continue
+                if signature['sig_type'] == 0x28:
+                    current_item['revoked'] = True
+                    continue
+                _apply_openpgp_self_signature(current_item, signature)
+                if current_item['_self_sig_created'] == signature['created']:
+                    # A signing subkey has to confirm that it belongs to the
+                    # primary key with an embedded primary key binding
+                    # signature (0x19), refer to RFC 4880, section 11.1.
+                    current_item['material']['cross_certified'] = \
+                        _verify_openpgp_primary_key_binding(current_item, signature, subkey_hash_data)
+    valid_keys = []
+    for key in keys:
+        valid_uids = [x for x in key.pop('_uids') if x['valid']]
+        if not valid_uids:
+            continue
+        valid_keys.append(key)
+        key['uids'] = [x['uid'] for x in valid_uids if x['uid'] is not None]
+        key['sigs'] = [sig for uid in valid_uids for sig in uid['sigs']]
+        # Subkeys without a valid binding signature are not part of the key.
+        key['subkeys'] = [x for x in key['subkeys'] if x.get('_self_sig_created') is not None]
+        for item in [key] + key['subkeys']:
+            item.pop('_self_sig_created', None)
+    return valid_keys
+
+
+_OPENPGP_HASH_ALGOS = {
+    # OpenPGP hash algorithm ID: (hashlib name, DER encoded DigestInfo prefix
+    # for EMSA-PKCS1-v1_5).
+    2: ('sha1', bytes.fromhex('3021300906052b0e03021a05000414')),
+    3: ('ripemd160', bytes.fromhex('3021300906052b2403020105000414')),
+    8: ('sha256', bytes.fromhex('3031300d060960864801650304020105000420')),
+    9: ('sha384', bytes.fromhex('3041300d060960864801650304020205000430')),
+    10: ('sha512', bytes.fromhex('3051300d060960864801650304020305000440')),
+    11: ('sha224', bytes.fromhex('302d300d06096086480165030402040500041c')),
+}
+
+_ED25519_OID = bytes.fromhex('2b06010401da470f01')
+_ED25519_P = 2 ** 255 - 19
+_ED25519_L = 2 ** 252 + 27742317777372353535851937790883648493
+_ED25519_D = -121665 * pow(121666, _ED25519_P - 2, _ED25519_P) % _ED25519_P
+_ED25519_SQRT_M1 = pow(2, (_ED25519_P - 1) // 4, _ED25519_P)
+
+
+def _ed25519_point_add(point_a, point_b):
+    # Points in extended homogeneous coordinates, refer to RFC 8032.
+    p = _ED25519_P
+    a = (point_a[1] - point_a[0]) * (point_b[1] - point_b[0]) % p
+    b = (point_a[1] + point_a[0]) * (point_b[1] + point_b[0]) % p
+    c = 2 * point_a[3] * point_b[3] * _ED25519_D % p
+    d = 2 * point_a[2] * point_b[2] % p
+    (e, f, g, h) = (b - a, d - c, d + c, b + a)
+    return (e * f % p, g * h % p, f * g % p, e * h % p)
+
+
+def _ed25519_point_mul(scalar, point):
+    result = (0, 1, 1, 0)
+    while scalar > 0:
+        if scalar & 1:
+            result = _ed25519_point_add(result, point)
+        point = _ed25519_point_add(point, point)
+        scalar >>= 1
+    return result
+
+
+def _ed25519_point_equal(point_a, point_b):
+    p = _ED25519_P
+    return ((point_a[0] * point_b[2] - point_b[0] * point_a[2]) % p == 0 and
+            (point_a[1] * point_b[2] - point_b[1] * point_a[2]) % p == 0)
+
+
+def _ed25519_recover_x(y, sign):
+    p = _ED25519_P
+    if y >= p:
+        return None
+    x2 = (y * y - 1) * pow(_ED25519_D * y * y + 1, p - 2, p) % p
+    if x2 == 0:
+        return None if sign else 0
+    x = pow(x2, (p + 3) // 8, p)
+    if (x * x - x2) % p != 0:
+        x = x * _ED25519_SQRT_M1 % p
+    if (x * x - x2) % p != 0:
+        return None
+    if (x & 1) != sign:
+        x = p - x
+    return x
+
+
+def _ed25519_point_decompress(encoded_point):
+    if len(encoded_point) != 32:
+        return None
+    y = int.from_bytes(encoded_point, 'little')
+    sign = y >> 255
+    y &= (1 << 255) - 1
+    x = _ed25519_recover_x(y, sign)
+    if x is None:
+        return None
+    return (x, y, 1, x * y % _ED25519_P)
+
+
+_ED25519_G_Y = 4 * pow(5, _ED25519_P - 2, _ED25519_P) % _ED25519_P
+_ED25519_G = _ed25519_point_decompress(_ED25519_G_Y.to_bytes(32, 'little'))
+
+
+def _ed25519_verify(public_key, message, signature):
+    point_a = _ed25519_point_decompress(public_key)
+    point_r = _ed25519_point_decompress(signature[:32])
+    if point_a is None or point_r is None:
+        return False
+    s = int.from_bytes(signature[32:], 'little')
+    if s >= _ED25519_L:
+        return False
+    h = int.from_bytes(
+        hashlib.sha512(signature[:32] + public_key + message).digest(),
+        'little',
+    ) % _ED25519_L
+    return _ed25519_point_equal(
+        _ed25519_point_mul(s, _ED25519_G),
+        _ed25519_point_add(point_r, _ed25519_point_mul(h, point_a)),
+    )
+
+
+def _get_openpgp_key_hash_prefix(key_item):
+    body = key_item['material']['packet']
+    return b'\x99' + len(body).to_bytes(2, 'big') + body
+
+
+def _verify_openpgp_primary_key_binding(subkey, binding_signature, signed_data):
+    if binding_signature['embedded_signature'] is None:
+        return False
+    try:
+        embedded_signature = _parse_openpgp_signature(binding_signature['embedded_signature'])
+    except Exception:
+        return False
+    if embedded_signature['sig_type'] != 0x19:
+        return False
+    return _verify_openpgp_signature(subkey, embedded_signature, signed_data)
+
+
+def _verify_openpgp_signature(key_item, signature, signed_data):
+    """
+    Check that `signature` was made by `key_item` over `signed_data`.
+    `signed_data` is everything which is hashed before the signature
+    specific fields, refer to RFC 4880, section 5.2.4.
+    """
+    if signature['hash_algo'] not in _OPENPGP_HASH_ALGOS:
+        return False
+    (hash_name, digest_info) = _OPENPGP_HASH_ALGOS[signature['hash_algo']]
+    try:
+        hash_obj = hashlib.new(hash_name)
+    except ValueError:
+        return False
+    hash_obj.update(signed_data)
+    hash_obj.update(signature['hashed_data'])
+    if signature['version'] == 4:
+        hash_obj.update(b'\x04\xff' + len(signature['hashed_data']).to_bytes(4, 'big'))
+    digest = hash_obj.digest()
+    if digest[:2] != signature['left16']:
+        return False
+
+    material = key_item['material']
+    if key_item['algo'] in [1, 3] and signature['pub_algo'] in [1, 3]:
+        (signature_value, pos) = _read_mpi(signature['mpis'], 0)
+        key_length = (material['n'].bit_length() + 7) // 8
+        encoded_message = b'\x00\x01' + b'\xff' * (key_length - len(digest_info) - len(digest) - 3) + \
+            b'\x00' + digest_info + digest
+        if signature_value >= material['n']:
+            return False
+        return pow(signature_value, material['e'], material['n']).to_bytes(key_length, 'big') == encoded_message
+    elif key_item['algo'] == 22 and signature['pub_algo'] == 22 and material['oid'] == _ED25519_OID:
+        (r, pos) = _read_mpi(signature['mpis'], 0)
+        (s, pos) = _read_mpi(signature['mpis'], pos)
+        if r.bit_length() > 256 or s.bit_length() > 256:
+            return False
+        # The public key is prefixed with 0x40 to mark the native point
+        # format.
+        return _ed25519_verify(
+            material['point'].to_bytes(33, 'big')[1:],
+            digest,
+            r.to_bytes(32, 'big') + s.to_bytes(32, 'big'),
+        )
+    return False
+
+
+class SignatureVerifier:
+    """
+    Verify detached OpenPGP signatures in-process. The public keys are
+    parsed once and are reused for all verifications.
+    Supported are RSA and EdDSA (Ed25519) signatures made by primary keys or
+    subkeys. Only subkeys with a valid binding signature are contained in the
+    keys returned by :func:`_parse_openpgp_keys` and only those which are
+    capable of signing and are cross-certified by a primary key binding
+    signature are used.
+    """
+
+    def __init__(self, keys):
+        self._keys_by_keyid = {}
+        for key in keys:
+            signing_items = [
+                x for x in key['subkeys']
+                if 's' in x['capabilities'] and x['material'].get('cross_certified')
+            ]
+            # Without key flags the usage is not restricted.
+            if key['capabilities'] == '' or 's' in key['capabilities']:
+                signing_items.append(key)
+            for item in signing_items:
+                # Subkeys can not outlive the primary key.
+                expires = [x for x in [key['expires'], item['expires']] if x is not None]
+                self._keys_by_keyid[item['keyid'].upper()] = {
+                    'fingerprint': item['fingerprint'],
+                    'algo': item['algo'],
+                    'material': item['material'],
+                    'created': item['created'],
+                    'expires': min(expires) if expires else None,
+                    'revoked': key['revoked'] or item['revoked'],
+                }
+
+    def _verify_signature_packet(self, data, signature):
+        key = self._keys_by_keyid.get(signature['keyid'])
+        if key is None or signature['created'] is None:
+            return None
+        if signature['sig_type'] == 0x01:
+            data = re.sub(b'\r?\n', b'\r\n', data)
+        elif signature['sig_type'] != 0x00:
+            return None
+        if not _verify_openpgp_signature(key, signature, data):
+            return None
+
+        now = int(time.time())
+        # Same order of precedence as the status codes of GnuPG.
+        if signature['created'] < key['created']:
+            status = 'not-yet-valid'
+        elif key['revoked']:
+            status = 'revoked-key'
+        elif key['expires'] is not None and key['expires'] <= now:
+            status = 'expired-key'
+        elif signature['sig_expires'] and signature['created'] + signature['sig_expires'] <= now:
+            status = 'expired-signature'
+        else:
+            status = 'good'
+        return {
+            'fingerprint': key['fingerprint'],
+            'created': signature['created'],
+            'status': status,
+        }
+
+    def verify(self, data, signature_data):
+        """
+        Return the fingerprint of the key which made the detached signature
+        over `data` or None if no good signature could be found.
+        Like with GnuPG, signatures made by revoked or expired keys, expired
+        signatures and signatures made before the key was created are not
+        good, refer to :meth:`verify_signature`.
+        """
+        result = self.verify_signature(data, signature_data)
+        if result is None or result['status'] != 'good':
+            return None
+        return result['fingerprint']
+
+    def verify_signature(self, data, signature_data):
+        """
+        Return a dict with the fingerprint of the key which made the
+        detached signature over `data`, the creation time of the signature
+        and its status or None if the signature could not be verified.
+        The status is one of 'good', 'not-yet-valid', 'revoked-key',
+        'expired-key' and 'expired-signature'.
+        """
+        try:
+            signatures = [
+                _parse_openpgp_signature(body)
+                for (tag, body) in _iter_openpgp_packets(_dearmor_openpgp(signature_data))
+                if tag == 2
+            ]
+        except Exception:
+            # Not an OpenPGP signature (for example a SSH signature) or a
+            # truncated one.
+            return None
+        for signature in signatures:
+            if signature['keyid'] is None:
+                continue
+            result = self._verify_signature_packet(data, signature)
+            if result is not None:
+                return result
+        return None
+
+    def verify_batch(self, items):
+        """
+        Verify an iterable of (data, signature_data) tuples.
+        Yields the result of :meth:`verify` for each item in order.
+        """
+        for (data, signature_data) in items:
+            yield self.verify(data, signature_data)
+
+    def _split_git_object(self, object_type, content):
+        """
+        Split a commit or tag object into the signed payload and the
+        signature. The signature is None for unsigned objects.
+        """
+        if object_type == b'commit':
+            (headers, separator, message) = content.partition(b'\n\n')
+            payload_lines = []
+            signature_lines = None
+            in_signature = False
+            for line in headers.split(b'\n'):
+                if line.startswith(b'gpgsig '):
+                    signature_lines = [line[len(b'gpgsig '):]]
+                    in_signature = True
+                elif in_signature and line.startswith(b' '):
+                    signature_lines.append(line[1:])
+                else:
+                    in_signature = False
+                    payload_lines.append(line)
+            if signature_lines is None:
+                return (content, None)
+            return (b'\n'.join(payload_lines) + separator + message, b'\n'.join(signature_lines))
+        elif object_type == b'tag':
+            signature_pos = content.find(b'-----BEGIN PGP SIGNATURE-----')
+            if signature_pos == -1:
+                return (content, None)
+            return (content[:signature_pos], content[signature_pos:])
+        return (content, None)
+
+    def verify_git_objects(self, repo_path, object_names):
+        """
+        Verify the signatures of the given git commits or tags.
+        All objects are read through one :command:`git cat-file --batch`
+        process. Yields a dict for each object. The fingerprint, creation
+        time and status are those returned by :meth:`verify_signature` and
+        None if the signature could not be verified.
+        """
+        repo = git.Repo(repo_path)
+        for object_name in object_names:
+            (hexsha, object_type, size, content) = repo.git.get_object_data(object_name)
+            (payload, signature_data) = self._split_git_object(object_type, content)
+            result = None if signature_data is None else self.verify_signature(payload, signature_data)
+            if result is None:
+                result = {'fingerprint': None, 'created': None, 'status': None}
+            result.update({
+                'object': hexsha.decode('ascii') if isinstance(hexsha, bytes) else hexsha,
+                'signed': signature_data is not None,
+            })
+            yield result
+
+
+class OpenPGPBackend:
+    """
+    Interface for the OpenPGP implementation used by :class:`Keyring`.
+
+    Public keys are described as dicts in the format returned by
+    :func:`_parse_gpg_colons` so that the results of all backends can be
+    compared. A backend instance holds its own set of imported keys and
+    should be used as context manager so that temporary state is cleaned up.
+    """
+
+    name = None
+
+    @classmethod
+    def is_available(cls):
+        return True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        pass
+
+    def import_keys(self, key_data):
+        """
+        Import the public keys from `key_data` (armored or binary).
+        Returns the list of fingerprints of the imported primary keys.
+        """
+        raise NotImplementedError
+
+    def list_keys(self, sigs=False):
+        """
+        Return the imported keys. With `sigs`, the signatures over the UIDs
+        are included. Their validity is '!' if the signature is
+        cryptographically valid, '-' if it is bad and '?' if it could not be
+        checked because the key of the signer is not available or has been
+        revoked. Whether the signer key was valid when the signature was
+        made is not taken into account.
+        """
+        raise NotImplementedError
+
+    def inspect_key(self, key_data):
+        """
+        Return the public keys contained in `key_data` without importing
+        them into the set of keys of this backend instance.
+        """
+        with type(self)() as backend:
+            backend.import_keys(key_data)
+            return backend.list_keys()
+
+    def verify(self, data, signature):
+        """
+        Verify the detached `signature` over `data` against the imported
+        keys. Returns the fingerprint of the signing (sub)key or None if the
+        signature could not be verified.
+        """
+        raise NotImplementedError
+
+
+class GnuPGBackend(OpenPGPBackend):
+
+    name = 'gnupg'
+
+    @classmethod
+    def is_available(cls):
+        return shutil.which('gpg') is not None
+
+    def __init__(self):
+        self._temp_gpg_home = TemporaryDirectory()
+        self._gpg = GPG(gnupghome=self._temp_gpg_home.name)
+
+    def close(self):
+        self._temp_gpg_home.cleanup()
+
+    def import_keys(self, key_data):
+        import_result = self._gpg.import_keys(key_data)
+        return [x['fingerprint'] for x in import_result.results if x.get('fingerprint')]
+
+    def _run_gpg_list(self, list_args):
+        return _parse_gpg_colons(check_output([
+            'gpg',
+            '--homedir', self._temp_gpg_home.name,
+            '--with-colons',
+            '--fixed-list-mode',
+        ] + list_args, stderr=DEVNULL).decode('utf-8'))
+
+    def list_keys(self, sigs=False):
+        if not sigs:
+            return self._run_gpg_list(['--list-public-keys'])
+
+        keys = self._run_gpg_list(['--check-sigs'])
+        # gpg does not check certifications made by keys which are expired
+        # at the time of the listing and reports them as '?' unless it has
+        # cached the result while importing. Check them again at the last
+        # point in time at which the signer key was valid, once per
+        # expiration date.
+        keys_by_keyid = dict([(x['keyid'], x) for x in keys])
+        recheck_times = {}
+        for key in keys:
+            for (sig_index, sig) in enumerate(key['sigs']):
+                signer_key = keys_by_keyid.get(sig['keyid'])
+                if (sig['validity'] == '?' and signer_key is not None and
+                        not signer_key['revoked'] and signer_key['expires'] is not None):
+                    recheck_times.setdefault(signer_key['expires'] - 1, []).append((key, sig_index))
+        for (recheck_time, sig_refs) in sorted(recheck_times.items()):
+            rechecked_keys = dict([
+                (x['fingerprint'], x)
+                for x in self._run_gpg_list(['--faked-system-time', str(recheck_time), '--check-sigs'])
+            ])
+            for (key, sig_index) in sig_refs:
+                key['sigs'][sig_index]['validity'] = \
+                    rechecked_keys[key['fingerprint']]['sigs'][sig_index]['validity']
+        return keys
+
+    def verify(self, data, signature):
+        with NamedTemporaryFile() as signature_fh:
+            signature_fh.write(signature)
+            signature_fh.flush()
+            verified = self._gpg.verify_data(signature_fh.name, data)
+        if not verified.valid:
+            return None
+        return verified.fingerprint
+
+
+class PythonBackend(OpenPGPBackend):
+    """
+    Pure Python backend which parses the OpenPGP packets (RFC 4880) itself.
+    It does not need any external program but does only handle v4 keys.
+    Signatures can only be verified for RSA and EdDSA (Ed25519) keys. Keys
+    using other algorithms have no valid self-signature and are dropped.
+    """
+
+    name = 'python'
+
+    _KEY_FLAGS_CAPABILITIES = [
+        # In the order used by GnuPG.
+        (0x0c, 'e'),
+        (0x02, 's'),
+        (0x01, 'c'),
+        (0x20, 'a'),
+    ]
+
+    def __init__(self):
+        self._keys = []
+        self._signature_verifier = None
+
+    def import_keys(self, key_data):
+        keys = _parse_openpgp_keys(key_data)
+        imported_fingerprints = set([x['fingerprint'] for x in self._keys])
+        for key in keys:
+            if key['fingerprint'] not in imported_fingerprints:
+                self._keys.append(key)
+        self._signature_verifier = None
+        return [x['fingerprint'] for x in keys]
+
+    def _get_sig_validity(self, sig, keys_by_keyid):
+        if '_signature' not in sig:
+            return sig['validity']
+        signer_key = keys_by_keyid.get(sig['keyid'])
+        # Like GnuPG, certifications by revoked keys are not checked.
+        if signer_key is None or signer_key['revoked']:
+            return '?'
+        if _verify_openpgp_signature(signer_key, sig['_signature'], sig['_signed_data']):
+            return '!'
+        return '-'
+
+    def list_keys(self, sigs=False):
+        keys_by_keyid = dict([(x['keyid'], x) for x in self._keys])
+        keys = []
+        for key in self._keys:
+            key = dict(key)
+            del key['material']
+            key['subkeys'] = [dict(x) for x in key['subkeys']]
+            for subkey in key['subkeys']:
+                del subkey['material']
+            if sigs:
+                key['sigs'] = [
+                    dict(
+                        [(k, v) for (k, v) in sig.items() if not k.startswith('_')],
+                        validity=self._get_sig_validity(sig, keys_by_keyid),
+                    )
+                    for sig in key['sigs']
+                ]
+            else:
+                key['sigs'] = []
+            keys.append(key)
+        return keys
+
+    def verify(self, data, signature):
+        if self._signature_verifier is None:
+            self._signature_verifier = SignatureVerifier(self._keys)
+        return self._signature_verifier.verify(data, signature)
+
+
+_OPENPGP_BACKENDS = dict([(x.name, x) for x in [GnuPGBackend, PythonBackend]])
+
+
+class KeyExpiryTimeline:
+    """
+    Expiration dates of primary keys and signing subkeys sorted by date.
+    Keys without expiration date are sorted last.
+    """
+
+    _PROMETHEUS_METRIC = 'debops_keyring_key_expiry_timestamp_seconds'
+
+    def __init__(self, entries):
+        self._entries = sorted(
+            entries,
+            key=lambda x: (x['expires'] is None, x['expires'] or 0, x['fingerprint']),
+        )
+        self._expires_index = [x['expires'] for x in self._entries if x['expires'] is not None]
+
+    def get_entries(self):
+        return list(self._entries)
+
+    def get_expiring_within(self, days, now=None):
+        """
+        Return all entries which expire within the given number of days.
+        Entries which have already expired are included.
+        """
+        if now is None:
+            now = int(time.time())
+        end_pos = bisect.bisect_right(self._expires_index, now + days * 24 * 60 * 60)
+        return self._entries[:end_pos]
+
+    def get_prometheus_metrics(self):
+        def escape_label_value(value):
+            return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+        lines = [
+            '# HELP {} Expiration date of OpenPGP keys in the debops-keyring'
+            ' as Unix timestamp.'.format(self._PROMETHEUS_METRIC),
+            '# TYPE {} gauge'.format(self._PROMETHEUS_METRIC),
+        ]
+        for entry in self._entries:
+            lines.append((
+                '{metric}{{nick="{nick}",keyid="{keyid}",'
+                'fingerprint="{fingerprint}",type="{type}"}} {value}'
+            ).format(
+                metric=self._PROMETHEUS_METRIC,
+                nick=escape_label_value(entry['nick']),
+                keyid=escape_label_value(entry['keyid']),
+                fingerprint=entry['fingerprint'],
+                type=entry['type'],
+                value='+Inf' if entry['expires'] is None else entry['expires'],
+            ))
+        return '\n'.join(lines) + '\n'
+
+    def _write_file_atomically(self, output_file, content):
+        # The node-exporter textfile collector might read the file at any
+        # time so it is replaced in one step.
+        temp_file = '{}.{}.tmp'.format(output_file, os.getpid())
+        with open(temp_file, 'w') as output_fh:
+            output_fh.write(content)
+        os.replace(temp_file, output_file)
+
+    def write_prometheus_metrics(self, output_file):
+        self._write_file_atomically(output_file, self.get_prometheus_metrics())
+
+    def write_json(self, output_file):
+        self._write_file_atomically(
+            output_file,
+            json.dumps(self._entries, indent=2, sort_keys=True) + '\n',
+        )
+
+
+class CertificationGraph:
+    """
+    Directed graph of certifications between entities. An edge from A to
+    B means that A has certified (signed) a UID of a public key of B.
+    Edges are indexed in both directions so that lookups are cheap.
+    """
+
+    def __init__(self):
+        self._certifies = {}
+        self._certified_by = {}
+
+    def add_node(self, nick):
+        self._certifies.setdefault(nick, set([]))
+        self._certified_by.setdefault(nick, set([]))
+
+    def add_certification(self, signer_nick, signee_nick):
+        self.add_node(signer_nick)
+        self.add_node(signee_nick)
+        self._certifies[signer_nick].add(signee_nick)
+        self._certified_by[signee_nick].add(signer_nick)
+
+    def get_nodes(self):
+        return sorted(self._certifies)
+
+    def get_certifies(self, nick):
+        return sorted(self._certifies.get(nick, []))
+
+    def get_certified_by(self, nick):
+        return sorted(self._certified_by.get(nick, []))
+
+    def get_shortest_path(self, from_nick, to_nick):
+        """
+        Return the shortest certification path from one entity to another
+        as list of nicks (including both ends) or None if there is no path.
+        """
+        if from_nick not in self._certifies or to_nick not in self._certifies:
+            return None
+        previous = {from_nick: None}
+        queue = deque([from_nick])
+        while queue:
+            nick = queue.popleft()
+            if nick == to_nick:
+                path = []
+                while nick is not None:
+                    path.append(nick)
+                    nick = previous[nick]
+                return list(reversed(path))
+            for next_nick in sorted(self._certifies[nick]):
+                if next_nick not in previous:
+                    previous[next_nick] = nick
+                    queue.append(next_nick)
+        return None
+
+    def get_not_certified_by(self, signer_nicks, nicks=None):
+        """
+        Return the entities which are not certified by any of the given
+        signers. Signers are not required to certify themselves.
+        """
+        signer_nicks = set(signer_nicks)
+        if nicks is None:
+            nicks = self._certifies.keys()
+        return sorted([
+            nick for nick in nicks
+            if nick not in signer_nicks and signer_nicks.isdisjoint(self._certified_by.get(nick, []))
+        ])
+
+
 class Keyring:
 
     _EXCLUSIVE_ROLES = set([
@@ -63,6 +1113,32 @@ class Keyring:
         'leader',
         'admin',
     ]
+    _COMMIT_SIGNER_ROLES = [
+        # Roles whose members are expected to sign commits in the keyring
+        # repository.
+        'developer',
+        'bot',
+    ]
+
+    _SIGNATURE_CHECK_FLAG_REASONS = {
+        # Good signatures as reported by `git log --format=%G?` which are
+        # flagged nevertheless.
+        'R': 'signing key revoked',
+        'X': 'signature expired',
+        'Y': 'signing key expired',
+    }
+
+    _ROLE_FILES = [
+        # File name in the roles directory and the role it defines.
+        ('leader', 'leader'),
+        ('admins', 'admin'),
+        ('developers', 'developer'),
+        ('contributors', 'contributor'),
+        ('bots', 'bot'),
+    ]
+
+    _KEYIDS_LINE_RE = re.compile(r'^(?P<keyid>0x[0-9A-Fa-f]{16}) (?P<name>[^<]+) <(?P<nick>[^<>]+)>$')
+    _ROLE_LINE_RE = re.compile(r'^(?P<name>[^<]+) <(?P<nick>[^<>]+)>$')
 
     # https://keyring.debian.org/creating-key.html
     _OPENPGP_MIN_KEY_SIZE = 2048
@@ -71,37 +1147,95 @@ class Keyring:
         self,
         strict=True,
         keyring_name='debops-keyring-gpg',
+        backend='gnupg',
     ):
 
         self._entities = {}
+        # Long key IDs without 0x prefix in upper case mapped to nicks.
+        self._nick_by_keyid = {}
         self._strict = strict
         self._keyring_name = keyring_name
+        self._certification_graph = None
+        self._backend = backend
 
     def read_keyids(self, keyids_file):
         with open(keyids_file, 'r') as keyids_fd:
-            for keyid_line in keyids_fd:
-                _re = re.search(
-                    r'^(?P<keyid>[^ ]+) (?P<name>[^<]+) <(?P<nick>.*)>$',
-                    keyid_line,
+            self._read_keyids_lines(keyids_fd, keyids_file)
+
+    def _raise_on_errors(self, errors):
+        if len(errors) != 0:
+            raise Exception("Found {} problem(s) in the keyring files:\n{}".format(
+                len(errors),
+                '\n'.join(errors),
+            ))
+
+    def _read_keyids_lines(self, keyids_lines, keyids_file, errors=None):
+        """
+        Read the lines of a keyids file in one pass. All malformed lines,
+        duplicate key IDs and conflicting names are reported at once.
+        When `errors` is given, problems are appended to it instead of being
+        raised so that multiple files can be checked in one go.
+        """
+        raise_errors = errors is None
+        if raise_errors:
+            errors = []
+        keyid_count = 0
+        for (line_number, keyid_line) in enumerate(keyids_lines, start=1):
+            keyid_line = keyid_line.rstrip('\n')
+            if keyid_line.strip() == '':
+                continue
+            _re = self._KEYIDS_LINE_RE.match(keyid_line)
+            if _re is None:
+                errors.append(
+                    "{}:{}: Malformed line, expected '0x<long key ID> <name> <<nick>>': {}".format(
+                        keyids_file,
+                        line_number,
+                        keyid_line,
+                    )
                 )
-                nick = _re.group('nick')
-                self._entities.setdefault(nick, {
-                    # Redundant because the dict gets translated to a sorted
-                    # list later.
-                    'nick': _re.group('nick'),
-                    'keyids': [],  # Preserve order.
-                    'name': _re.group('name'),
-                    'roles': set([]),  # Sorted later.
-                })
-                self._entities[nick]['keyids'].append(_re.group('keyid'))
-                logging.info(
-                    "OK - Entity {nick} was correctly specified in the"
-                    " {keyids_file} file (public key: {pubkey_id}).".format(
-                        nick=nick,
-                        keyids_file=keyids_file,
-                        pubkey_id=_re.group('keyid'),
+                continue
+            (keyid, name, nick) = _re.group('keyid', 'name', 'nick')
+            keyid_index = keyid[2:].upper()
+            if keyid_index in self._nick_by_keyid:
+                errors.append(
+                    "{}:{}: Duplicate key ID {}, already assigned to entity {}.".format(
+                        keyids_file,
+                        line_number,
+                        keyid,
+                        self._nick_by_keyid[keyid_index],
                     )
                 )
+                continue
+            if nick in self._entities and self._entities[nick]['name'] != name:
+                errors.append(
+                    "{}:{}: Conflicting name for entity {}: {} (previously: {}).".format(
+                        keyids_file,
+                        line_number,
+                        nick,
+                        name,
+                        self._entities[nick]['name'],
+                    )
+                )
+                continue
+            self._nick_by_keyid[keyid_index] = nick
+            self._entities.setdefault(nick, {
+                # Redundant because the dict gets translated to a sorted
+                # list later.
+                'nick': nick,
+                'keyids': [],  # Preserve order.
+                'name': name,
+                'roles': set([]),  # Sorted later.
+            })
+            self._entities[nick]['keyids'].append(keyid)
+            keyid_count += 1
+        logging.info(
+            "OK - {keyid_count} public keys were read from the {keyids_file} file.".format(
+                keyid_count=keyid_count,
+                keyids_file=keyids_file,
+            )
+        )
+        if raise_errors:
+            self._raise_on_errors(errors)
 
     def _role_sort(self, role):
         if role in self._ADDITONAL_ROLES:
@@ -116,9 +1250,12 @@ class Keyring:
                 key=self._role_sort,
             )
 
-    def check_entity_consistency(self):
+    def check_entity_consistency(self, nicks=None):
         def_roles = self._EXCLUSIVE_ROLES.union(set(self._ADDITONAL_ROLES))
-        for nick, entity_data in self._entities.items():
+        if nicks is None:
+            nicks = self._entities.keys()
+        for nick in nicks:
+            entity_data = self._entities[nick]
             exclusive_role_member = self._EXCLUSIVE_ROLES.intersection(
                 entity_data['roles']
             )
@@ -151,43 +1288,90 @@ class Keyring:
 
     def read_entity_role_file(self, entity_role_file, entity_role_name):
         with open(entity_role_file, 'r') as entity_role_fh:
-            for entity_role_line in entity_role_fh:
-                _re = re.search(
-                    r'^(?P<name>[^<]+) <(?P<nick>.*)>$',
-                    entity_role_line,
+            self._read_entity_role_lines(entity_role_fh, entity_role_file, entity_role_name)
+
+    def read_entity_role_files(self, roles_dir='roles', errors=None):
+        raise_errors = errors is None
+        if raise_errors:
+            errors = []
+        for (role_file, role) in self._ROLE_FILES:
+            entity_role_file = os.path.join(roles_dir, role_file)
+            with open(entity_role_file, 'r') as entity_role_fh:
+                self._read_entity_role_lines(entity_role_fh, entity_role_file, role, errors)
+        if raise_errors:
+            self._raise_on_errors(errors)
+
+    def read_keyring_files(self, keyids_file='keyids', roles_dir='roles'):
+        """
+        Read the keyids file and all role files and report all problems
+        found in any of them at once.
+        """
+        errors = []
+        with open(keyids_file, 'r') as keyids_fd:
+            self._read_keyids_lines(keyids_fd, keyids_file, errors)
+        self.read_entity_role_files(roles_dir, errors)
+        self._raise_on_errors(errors)
+
+    def _read_entity_role_lines(self, entity_role_lines, entity_role_file, entity_role_name, errors=None):
+        raise_errors = errors is None
+        if raise_errors:
+            errors = []
+        member_count = 0
+        for (line_number, entity_role_line) in enumerate(entity_role_lines, start=1):
+            entity_role_line = entity_role_line.rstrip('\n')
+            if entity_role_line.strip() == '':
+                continue
+            _re = self._ROLE_LINE_RE.match(entity_role_line)
+            if _re is None:
+                errors.append(
+                    "{}:{}: Malformed line, expected '<name> <<nick>>': {}".format(
+                        entity_role_file,
+                        line_number,
+                        entity_role_line,
+                    )
                 )
-                try:
-                    nick = _re.group('nick')
-                except AttributeError:
-                    raise Exception("You probably made a mistake in the {} file.".format(
+                continue
+            (name, nick) = _re.group('name', 'nick')
+            if nick not in self._entities:
+                errors.append(
+                    "{}:{}: Nickname {} not present in given keyid file.".format(
                         entity_role_file,
-                    ))
-                if nick not in self._entities:
-                    raise Exception("Nickname {} not present in given keyid file.".format(
+                        line_number,
                         nick,
-                    ))
-                self._entities[nick]['roles'].add(entity_role_name)
-                if self._strict and self._entities[nick]['name'] != _re.group('name'):
-                    raise Exception(
-                        textwrap.dedent(
-                            """
-                            Name mismatch in {} file compared to the keyids file.
-                            Expected: {}
-                            Actual: {}
-                            """
-                        ).lstrip().format(
-                            entity_role_file,
-                            _re.group('name'),
-                            self._entities[nick]['name'],
-                        )
                     )
-                logging.info(
-                    "OK - Entity {nick} information in {entity_role_file}"
-                    " is consistent with given information in the keyids file.".format(
-                        nick=nick,
-                        entity_role_file=entity_role_file,
+                )
+                continue
+            if entity_role_name in self._entities[nick]['roles']:
+                errors.append(
+                    "{}:{}: Entity {} is listed more than once.".format(
+                        entity_role_file,
+                        line_number,
+                        nick,
                     )
                 )
+                continue
+            self._entities[nick]['roles'].add(entity_role_name)
+            member_count += 1
+            if self._entities[nick]['name'] != name:
+                name_mismatch = "{}:{}: Name mismatch compared to the keyids file. Expected: {} Actual: {}".format(
+                    entity_role_file,
+                    line_number,
+                    self._entities[nick]['name'],
+                    name,
+                )
+                if self._strict:
+                    errors.append(name_mismatch)
+                else:
+                    logging.warning(name_mismatch)
+        logging.info(
+            "OK - {member_count} entities in {entity_role_file}"
+            " are consistent with given information in the keyids file.".format(
+                member_count=member_count,
+                entity_role_file=entity_role_file,
+            )
+        )
+        if raise_errors:
+            self._raise_on_errors(errors)
 
     def entity_is_member_of(self, nick, role):
         return role in self._entities[nick]['roles']
@@ -214,22 +1398,22 @@ class Keyring:
 # E. g. when to pass and when to fail would need to be decided ourself.
 # TODO: Recheck if hopenpgp-tools becomes usable (a proper exit code would be a start)
     def _check_openpgp_pubkey_from_file(self, pubkey_file, long_key_id):
-        with TemporaryDirectory() as temp_gpg_home:
-            gpg = GPG(gnupghome=temp_gpg_home)
+        with self._get_backend() as backend:
             with open(pubkey_file, 'rb') as pubkey_fh:
-                import_result = gpg.import_keys(pubkey_fh.read())
-            if len(import_result.results) == 0:
+                backend.import_keys(pubkey_fh.read())
+            keys = backend.list_keys()
+            if len(keys) == 0:
                 raise Exception(
                     "The OpenPGP file {} contains no OpenPGP keys."
                     " Keys: {}".format(
                         pubkey_file,
-                        import_result.results,
+                        keys,
                     )
                 )
             logging.info("OK - OpenPGP file {pubkey_file} contains one or more OpenPGP key.".format(
                 pubkey_file=pubkey_file,
             ))
-            fingerprint = [x['fingerprint'] for x in import_result.results if x.get('fingerprint')][0]
+            fingerprint = keys[0]['fingerprint']
             actual_long_key_id = fingerprint[-16:]
             given_long_key_id = re.sub(r'^0x', '', long_key_id)
             if actual_long_key_id.lower() != given_long_key_id.lower():
@@ -252,11 +1436,11 @@ class Keyring:
                 )
             )
 
-            list_key = gpg.list_keys()[0]
+            list_key = keys[0]
             epoch_time = int(time.time())
-            expires_time = int(list_key['expires'])
+            expires_time = list_key['expires']
             if self._strict:
-                if expires_time < epoch_time:
+                if expires_time is not None and expires_time < epoch_time:
                     raise Exception(
                         textwrap.dedent(
                             """
@@ -275,10 +1459,20 @@ class Keyring:
                         "OK - OpenPGP public key from {pubkey_file} is not expired."
                         " Expiration date: {expiration_date}".format(
                             pubkey_file=pubkey_file,
-                            expiration_date=datetime.fromtimestamp(expires_time),
+                            expiration_date=datetime.fromtimestamp(expires_time) if expires_time else 'never',
                         )
                     )
 
+            if self._strict:
+                if list_key['revoked']:
+                    raise Exception("The OpenPGP file {} contains a revoked OpenPGP key.".format(
+                        pubkey_file,
+                    ))
+                else:
+                    logging.info("OK - OpenPGP public key from {pubkey_file} is not revoked.".format(
+                        pubkey_file=pubkey_file,
+                    ))
+
             # https://keyring.debian.org/creating-key.html
             if self._strict:
                 if int(list_key['length']) < self._OPENPGP_MIN_KEY_SIZE:
@@ -368,7 +1562,8 @@ class Keyring:
                 'developers': [],
                 'contributors': [],
                 'bots': [],
-            }
+            },
+            'certification_graph': self._certification_graph,
         }
         for nick in self._get_sorted_nicks():
             exclusive_role_member = self._EXCLUSIVE_ROLES.intersection(
@@ -393,16 +1588,224 @@ class Keyring:
         with open(output_file, 'w') as output_fh:
             output_fh.write(self.get_entity_docs(template_file))
 
+    def _get_backend(self):
+        try:
+            backend_class = _OPENPGP_BACKENDS[self._backend]
+        except KeyError:
+            raise Exception("Unknown OpenPGP backend {}. Known backends: {}".format(
+                self._backend,
+                ', '.join(sorted(_OPENPGP_BACKENDS)),
+            ))
+        return backend_class()
+
+    def benchmark_backends(self, rounds=3):
+        """
+        Run the OpenPGP consistency checks through each available backend
+        and return the fastest run time of each backend in seconds.
+        All backends verify the self-signatures, subkey binding signatures
+        and revocations of the imported keys so that equivalent work is
+        compared. GnuPG is additionally run as external program for each
+        step which is included in its run time.
+        """
+        timings = {}
+        for backend_name, backend_class in sorted(_OPENPGP_BACKENDS.items()):
+            if not backend_class.is_available():
+                logging.info("Skipping unavailable OpenPGP backend {backend}.".format(
+                    backend=backend_name,
+                ))
+                continue
+            keyring = type(self)(
+                strict=self._strict,
+                keyring_name=self._keyring_name,
+                backend=backend_name,
+            )
+            keyring._entities = self._entities
+            keyring._nick_by_keyid = self._nick_by_keyid
+            run_times = []
+            for _ in range(rounds):
+                start_time = time.perf_counter()
+                keyring.check_openpgp_consistency()
+                keyring.read_certification_graph()
+                run_times.append(time.perf_counter() - start_time)
+            timings[backend_name] = min(run_times)
+            logging.info("OK - OpenPGP backend {backend} took {run_time:.3f} seconds.".format(
+                backend=backend_name,
+                run_time=timings[backend_name],
+            ))
+        return timings
+
+    def _import_keyring(self, gpg):
+        """
+        Import all public keys of the keyring with one import. Armored
+        files can not simply be concatenated so they are dearmored first.
+        """
+        key_data = b''
+        for long_key_id in sorted(os.listdir(self._keyring_name)):
+            with open(os.path.join(
+                self._keyring_name,
+                long_key_id
+            ), 'rb') as pubkey_fh:
+                key_data += _dearmor_openpgp(pubkey_fh.read())
+        gpg.import_keys(key_data)
+
+    def read_certification_graph(self):
+        """
+        Build the certification graph between all entities from a single
+        listing of all UID signatures of the keyring. Signer key IDs are
+        resolved against the fingerprints of the keyring itself so that
+        signatures made by keys outside of the keyring are ignored.
+        Only certifications which have been verified by the backend and
+        which were made while the signer key was valid are used. The
+        current expiration date of the signer key is used for this. A
+        certification is dropped when the signer revoked it later.
+        """
+        with self._get_backend() as backend:
+            self._import_keyring(backend)
+            keys = backend.list_keys(sigs=True)
+
+        nick_by_keyring_long_key_id = {}
+        for key in keys:
+            long_key_id = key['fingerprint'][-16:].upper()
+            if long_key_id in self._nick_by_keyid:
+                nick_by_keyring_long_key_id[long_key_id] = self._nick_by_keyid[long_key_id]
+
+        keys_by_long_key_id = dict([(x['keyid'].upper(), x) for x in keys])
+
+        def is_signer_key_valid_at(long_key_id, timestamp):
+            signer_key = keys_by_long_key_id.get(long_key_id)
+            if signer_key is None or signer_key['revoked'] or signer_key['created'] > timestamp:
+                return False
+            return signer_key['expires'] is None or timestamp < signer_key['expires']
+
+        graph = CertificationGraph()
+        for nick in self._entities.keys():
+            graph.add_node(nick)
+        for key in keys:
+            signee_nick = nick_by_keyring_long_key_id.get(key['fingerprint'][-16:].upper())
+            if signee_nick is None:
+                continue
+            revoked_at = {}
+            for sig in key['sigs']:
+                # Sig class 0x30 revokes certifications of the same UID.
+                if sig['validity'] == '!' and sig['sig_class'] == '30x':
+                    revocation_key = (sig['keyid'].upper(), sig['uid'])
+                    revoked_at[revocation_key] = max(sig['created'], revoked_at.get(revocation_key, 0))
+            for sig in key['sigs']:
+                signer_nick = nick_by_keyring_long_key_id.get(sig['keyid'].upper())
+                # Sig classes 0x10 to 0x13 are certifications of a UID.
+                if signer_nick is None or signer_nick == signee_nick or not re.match(r'^1[0-3]', sig['sig_class']):
+                    continue
+                if sig['validity'] != '!' or not is_signer_key_valid_at(sig['keyid'].upper(), sig['created']):
+                    continue
+                revocation_key = (sig['keyid'].upper(), sig['uid'])
+                if revocation_key in revoked_at and revoked_at[revocation_key] >= sig['created']:
+                    continue
+                graph.add_certification(signer_nick, signee_nick)
+
+        for nick in self._entities.keys():
+            self._entities[nick]['certifies'] = graph.get_certifies(nick)
+            self._entities[nick]['certified_by'] = graph.get_certified_by(nick)
+        self._certification_graph = graph
+        return graph
+
+    def get_key_expiry_timeline(self):
+        """
+        Return the expiry timeline of all primary keys and signing subkeys
+        of the entities. All keys are listed in one pass.
+        """
+        with self._get_backend() as backend:
+            self._import_keyring(backend)
+            keys = backend.list_keys()
+
+        entries = []
+        for key in keys:
+            nick = self._nick_by_keyid.get(key['keyid'].upper())
+            if nick is None:
+                continue
+            keyid = '0x' + key['keyid'].upper()
+            entries.append({
+                'nick': nick,
+                'keyid': keyid,
+                'fingerprint': key['fingerprint'],
+                'type': 'primary',
+                'expires': key['expires'],
+            })
+            for subkey in key['subkeys']:
+                if 's' in subkey['capabilities']:
+                    entries.append({
+                        'nick': nick,
+                        'keyid': keyid,
+                        'fingerprint': subkey['fingerprint'],
+                        'type': 'signing_subkey',
+                        'expires': subkey['expires'],
+                    })
+        return KeyExpiryTimeline(entries)
+
+    def get_certification_path(self, from_nick, to_nick):
+        if self._certification_graph is None:
+            self.read_certification_graph()
+        return self._certification_graph.get_shortest_path(from_nick, to_nick)
+
+    def get_entities_not_certified_by_role(self, role):
+        if self._certification_graph is None:
+            self.read_certification_graph()
+        return self._certification_graph.get_not_certified_by(
+            [nick for nick in self._entities if self.entity_is_member_of(nick, role)],
+            self._entities.keys(),
+        )
+
+    def get_signature_verifier(self):
+        keys = []
+        for long_key_id in os.listdir(self._keyring_name):
+            with open(os.path.join(self._keyring_name, long_key_id), 'rb') as pubkey_fh:
+                keys.extend(_parse_openpgp_keys(pubkey_fh.read()))
+        return SignatureVerifier(keys)
+
+    def verify_git_history(self, repo_path='.', rev='HEAD'):
+        """
+        Verify the signatures of all commits reachable from `rev` in-process
+        without spawning gpg for each commit. Commits with valid signatures
+        which are not good, for example because the key has been revoked,
+        are reported separately and are not counted as verified.
+        """
+        signature_verifier = self.get_signature_verifier()
+        report = {
+            'commits': 0,
+            'verified': 0,
+            'unsigned': [],
+            'unverified': [],
+            'not_yet_valid': [],
+            'revoked_key': [],
+            'expired_key': [],
+            'expired_signature': [],
+        }
+        rev_list_proc = git.Git(repo_path).rev_list(rev, as_process=True)
+        commit_hashes = (x.decode('ascii').strip() for x in rev_list_proc.stdout)
+        for result in signature_verifier.verify_git_objects(repo_path, commit_hashes):
+            report['commits'] += 1
+            if not result['signed']:
+                report['unsigned'].append(result['object'])
+            elif result['status'] is None:
+                report['unverified'].append(result['object'])
+            elif result['status'] == 'good':
+                report['verified'] += 1
+            else:
+                report[result['status'].replace('-', '_')].append(result['object'])
+        rev_list_proc.wait()
+        logging.info(
+            "OK - Verified {verified_count} of {commit_count} commits in"
+            " the repository '{repo_path}'.".format(
+                verified_count=report['verified'],
+                commit_count=report['commits'],
+                repo_path=repo_path,
+            )
+        )
+        return report
+
     def check_git_commits(self, repo_path='.'):
         with TemporaryDirectory() as temp_gpg_home:
             gpg = GPG(gnupghome=temp_gpg_home)
-
-            for long_key_id in os.listdir(self._keyring_name):
-                with open(os.path.join(
-                    self._keyring_name,
-                    long_key_id
-                ), 'rb') as pubkey_fh:
-                    gpg.import_keys(pubkey_fh.read())
+            self._import_keyring(gpg)
 
             repo = git.Git(repo_path)
             repo.update_environment(GNUPGHOME=temp_gpg_home)
@@ -455,6 +1858,270 @@ class Keyring:
 
         return True
 
+    def get_signer_report(self, repo_path='.', rev='HEAD', signer_roles=None):
+        """
+        Attribute each signed commit reachable from `rev` to an entity and
+        aggregate per entity statistics. The output of :command:`git log` is
+        processed as a stream so that the commits are not held in memory.
+        Commits with bad signatures, signatures by keys not in the keyring,
+        by expired or revoked keys and expired signatures are flagged.
+        """
+        if signer_roles is None:
+            signer_roles = self._COMMIT_SIGNER_ROLES
+        signer_roles = set(signer_roles)
+
+        report = {
+            'commits': 0,
+            'unsigned': 0,
+            'entities': {},
+            'flagged': [],
+        }
+        with TemporaryDirectory() as temp_gpg_home:
+            gpg = GPG(gnupghome=temp_gpg_home)
+            self._import_keyring(gpg)
+
+            repo = git.Git(repo_path)
+            repo.update_environment(GNUPGHOME=temp_gpg_home)
+            # %GK: key used to sign, %GP: fingerprint of the primary key
+            # whose subkey was used to sign.
+            log_proc = repo.log(
+                '--format=%H%x00%ct%x00%G?%x00%GK%x00%GP',
+                rev,
+                as_process=True,
+            )
+            for log_line in log_proc.stdout:
+                (commit_hash, commit_time, signature_check, signing_keyid, primary_fingerprint) = \
+                    log_line.decode('utf-8').rstrip('\n').split('\x00')
+                commit_time = int(commit_time)
+                report['commits'] += 1
+                if signature_check == 'N':
+                    report['unsigned'] += 1
+                    continue
+                if signature_check == 'B':
+                    report['flagged'].append({
+                        'commit': commit_hash,
+                        'keyid': signing_keyid,
+                        'reason': 'bad signature',
+                    })
+                    continue
+
+                nick = self._nick_by_keyid.get(primary_fingerprint[-16:].upper())
+                if nick is None:
+                    nick = self._nick_by_keyid.get(signing_keyid.upper())
+                if nick is None:
+                    report['flagged'].append({
+                        'commit': commit_hash,
+                        'keyid': signing_keyid,
+                        'reason': 'signing key not in keyring',
+                    })
+                    continue
+
+                entity_stats = report['entities'].setdefault(nick, {
+                    'commits': 0,
+                    'first_date': commit_time,
+                    'last_date': commit_time,
+                })
+                entity_stats['commits'] += 1
+                entity_stats['first_date'] = min(entity_stats['first_date'], commit_time)
+                entity_stats['last_date'] = max(entity_stats['last_date'], commit_time)
+                if signature_check in self._SIGNATURE_CHECK_FLAG_REASONS:
+                    report['flagged'].append({
+                        'commit': commit_hash,
+                        'keyid': signing_keyid,
+                        'nick': nick,
+                        'reason': self._SIGNATURE_CHECK_FLAG_REASONS[signature_check],
+                    })
+                if signer_roles.isdisjoint(self._entities[nick]['roles']):
+                    report['flagged'].append({
+                        'commit': commit_hash,
+                        'keyid': signing_keyid,
+                        'nick': nick,
+                        'reason': 'signer is not member of any of the roles: {}'.format(
+                            ', '.join(sorted(signer_roles)),
+                        ),
+                    })
+            log_proc.wait()
+
+        for entity_stats in report['entities'].values():
+            for date_key in ['first_date', 'last_date']:
+                entity_stats[date_key] = datetime.utcfromtimestamp(
+                    entity_stats[date_key]
+                ).isoformat() + 'Z'
+        logging.info(
+            "OK - Attributed signed commits of {commit_count} commits in"
+            " the repository '{repo_path}' ({flagged_count} flagged).".format(
+                commit_count=report['commits'],
+                repo_path=repo_path,
+                flagged_count=len(report['flagged']),
+            )
+        )
+        return report
+
+    def _get_keyring_blobs(self, git_repo, rev):
+        """
+        Return the blobs of all keyring related files at the given revision
+        indexed by their path relative to the root of the git repository.
+        No checkout is needed because the git objects are read directly.
+        """
+        tree = git_repo.commit(rev).tree
+        # A relative keyring name is relative to the root of the repository.
+        keyring_path = os.path.relpath(
+            os.path.join(git_repo.working_tree_dir, self._keyring_name),
+            git_repo.working_tree_dir,
+        )
+        blobs = {}
+        for path in ['keyids', 'roles', keyring_path]:
+            try:
+                item = tree[path]
+            except KeyError:
+                continue
+            if item.type == 'blob':
+                blobs[item.path] = item
+            else:
+                for sub_item in item.traverse():
+                    if sub_item.type == 'blob':
+                        blobs[sub_item.path] = sub_item
+        return (keyring_path, blobs)
+
+    def _get_keyring_from_blobs(self, blobs, validate=True):
+        """
+        Read the keyids and role files from the given blobs. Without
+        `validate`, problems are only logged and the name check is not
+        strict so that a broken revision can still be compared against.
+        """
+        keyring = type(self)(
+            strict=self._strict and validate,
+            keyring_name=self._keyring_name,
+        )
+        errors = []
+        if 'keyids' in blobs:
+            keyring._read_keyids_lines(
+                blobs['keyids'].data_stream.read().decode('utf-8').splitlines(True),
+                'keyids',
+                errors,
+            )
+        for (role_file, role) in self._ROLE_FILES:
+            role_path = 'roles/' + role_file
+            if role_path in blobs:
+                keyring._read_entity_role_lines(
+                    blobs[role_path].data_stream.read().decode('utf-8').splitlines(True),
+                    role_path,
+                    role,
+                    errors,
+                )
+        if validate:
+            keyring._raise_on_errors(errors)
+        else:
+            for error in errors:
+                logging.warning(error)
+        return keyring
+
+    def diff_revisions(self, base_rev, head_rev, repo_path='.'):
+        """
+        Compare the keyring between two git revisions and only validate what
+        changed. Files are compared by their blob hash so that unchanged files
+        are neither read nor checked again. The base revision is only read to
+        compute the changes so that a change fixing a broken keyring passes.
+        """
+        git_repo = git.Repo(repo_path)
+        (keyring_path, base_blobs) = self._get_keyring_blobs(git_repo, base_rev)
+        (keyring_path, head_blobs) = self._get_keyring_blobs(git_repo, head_rev)
+
+        report = {
+            'files': {
+                'added': sorted(set(head_blobs).difference(base_blobs)),
+                'removed': sorted(set(base_blobs).difference(head_blobs)),
+                'modified': sorted([
+                    path for path in set(base_blobs).intersection(head_blobs)
+                    if base_blobs[path].hexsha != head_blobs[path].hexsha
+                ]),
+            },
+            'entities': {'added': [], 'removed': [], 'modified': []},
+            'roles': {},
+            'keys': {'added': [], 'removed': [], 'modified': []},
+        }
+        changed_paths = set([])
+        for paths in report['files'].values():
+            changed_paths.update(paths)
+
+        key_prefix = keyring_path + '/'
+        for change_type, paths in report['files'].items():
+            report['keys'][change_type] = [
+                path[len(key_prefix):] for path in paths
+                if path.startswith(key_prefix)
+            ]
+
+        metadata_changed = any(not path.startswith(key_prefix) for path in changed_paths)
+        if not metadata_changed and len(report['keys']['removed']) == 0:
+            head_keyring = None
+        else:
+            head_keyring = self._get_keyring_from_blobs(head_blobs)
+
+        if metadata_changed:
+            base_keyring = self._get_keyring_from_blobs(base_blobs, validate=False)
+            base_nicks = set(base_keyring._entities)
+            head_nicks = set(head_keyring._entities)
+            report['entities']['added'] = sorted(head_nicks.difference(base_nicks))
+            report['entities']['removed'] = sorted(base_nicks.difference(head_nicks))
+            report['entities']['modified'] = sorted([
+                nick for nick in base_nicks.intersection(head_nicks)
+                if base_keyring._entities[nick] != head_keyring._entities[nick]
+            ])
+            for nick in sorted(base_nicks.union(head_nicks)):
+                base_roles = base_keyring._entities.get(nick, {}).get('roles', set([]))
+                head_roles = head_keyring._entities.get(nick, {}).get('roles', set([]))
+                if base_roles != head_roles:
+                    report['roles'][nick] = {
+                        'before': sorted(base_roles),
+                        'after': sorted(head_roles),
+                    }
+
+            changed_nicks = report['entities']['added'] + report['entities']['modified']
+            head_keyring.check_entity_consistency(changed_nicks)
+            for nick in changed_nicks:
+                for keyid in head_keyring._entities[nick]['keyids']:
+                    if key_prefix + keyid not in head_blobs:
+                        raise Exception(
+                            "Public key {} of entity {} is not present in {} at revision {}.".format(
+                                keyid,
+                                nick,
+                                keyring_path,
+                                head_rev,
+                            )
+                        )
+            logging.info(
+                "OK - All changed entities are consistent at revision {head_rev}.".format(
+                    head_rev=head_rev,
+                )
+            )
+
+        for keyid in report['keys']['removed']:
+            for nick, entity_data in head_keyring._entities.items():
+                if keyid in entity_data['keyids']:
+                    raise Exception(
+                        "Public key {} was removed but is still used by entity {}.".format(
+                            keyid,
+                            nick,
+                        )
+                    )
+
+        with TemporaryDirectory() as temp_keyring_dir:
+            for keyid in report['keys']['added'] + report['keys']['modified']:
+                pubkey_file = os.path.join(temp_keyring_dir, keyid)
+                with open(pubkey_file, 'wb') as pubkey_fh:
+                    pubkey_fh.write(head_blobs[key_prefix + keyid].data_stream.read())
+                self._check_openpgp_pubkey_from_file(pubkey_file, keyid)
+
+        logging.info(
+            "OK - Changes between {base_rev} and {head_rev} are consistent"
+            " ({changed_count} changed files).".format(
+                base_rev=base_rev,
+                head_rev=head_rev,
+                changed_count=len(changed_paths),
+            )
+        )
+        return report
+
 
 if __name__ == '__main__':
     from argparse import ArgumentParser
@@ -527,20 +2194,82 @@ if __name__ == '__main__':
         action='store_false',
         dest='consistency_check_git',
     )
+    args_parser.add_argument(
+        '--diff',
+        help="Only validate what changed between two git revisions"
+        " given as BASE..HEAD and report the changes as JSON.",
+        metavar='BASE..HEAD',
+    )
+    args_parser.add_argument(
+        '--signer-report',
+        help="Attribute all signed commits to entities and report"
+        " per entity statistics and suspicious commits as JSON.",
+        action='store_true',
+        default=False,
+    )
+    args_parser.add_argument(
+        '-b', '--backend',
+        help="OpenPGP backend to use for the keyring checks.",
+        choices=sorted(_OPENPGP_BACKENDS),
+        default='gnupg',
+    )
+    args_parser.add_argument(
+        '--benchmark-backends',
+        help="Run the keyring checks through each available OpenPGP backend"
+        " and report the run time of each as JSON.",
+        action='store_true',
+        default=False,
+    )
+    args_parser.add_argument(
+        '--expiry-prom-file',
+        help="Write the expiration dates of all primary keys and signing"
+        " subkeys as Prometheus metrics to the given file"
+        " (for the node-exporter textfile collector).",
+    )
+    args_parser.add_argument(
+        '--expiry-json-file',
+        help="Write the expiration dates of all primary keys and signing"
+        " subkeys as JSON to the given file.",
+    )
+    args_parser.add_argument(
+        '--expires-within',
+        help="Report all primary keys and signing subkeys which expire"
+        " within the given number of days as JSON.",
+        type=int,
+        metavar='DAYS',
+    )
+    args_parser.add_argument(
+        '--verify-history',
+        help="Verify the signatures of all commits in-process and report"
+        " unsigned and unverifiable commits as JSON.",
+        action='store_true',
+        default=False,
+    )
     args_parser.set_defaults(consistency_check=None)
     args_parser.set_defaults(consistency_check_keyring=True)
     args_parser.set_defaults(consistency_check_git=True)
     args = args_parser.parse_args()
 
-    if not args.output_file and not args.show_output and args.consistency_check is None:
+    expiry_modes = args.expiry_prom_file or args.expiry_json_file or args.expires_within is not None
+    report_modes = args.diff or args.signer_report or args.benchmark_backends or expiry_modes or args.verify_history
+    if not args.output_file and not args.show_output and args.consistency_check is None and not report_modes:
         args_parser.error("At least one of the following parameters is required: {}".format(
             ', '.join([
                 '--output-file',
                 '--show-output',
                 '--consistency-check',
+                '--diff',
+                '--signer-report',
+                '--benchmark-backends',
+                '--expiry-prom-file',
+                '--expiry-json-file',
+                '--expires-within',
+                '--verify-history',
             ])
         ))
-    if args.consistency_check is None and args.strict:
+    if args.diff and '..' not in args.diff:
+        args_parser.error("--diff expects a revision range in the form BASE..HEAD.")
+    if args.consistency_check is None and args.strict and not report_modes:
         args.consistency_check = True
 
     logger = logging.getLogger(__file__)
@@ -551,13 +2280,59 @@ if __name__ == '__main__':
 
     debops_keyring = Keyring(
         strict=args.strict,
+        backend=args.backend,
     )
-    debops_keyring.read_keyids('keyids')
-    debops_keyring.read_entity_role_file('./roles/leader', 'leader')
-    debops_keyring.read_entity_role_file('./roles/admins', 'admin')
-    debops_keyring.read_entity_role_file('./roles/developers', 'developer')
-    debops_keyring.read_entity_role_file('./roles/contributors', 'contributor')
-    debops_keyring.read_entity_role_file('./roles/bots', 'bot')
+
+    if args.diff:
+        # Both revisions are read from the git objects, the working tree is
+        # not used.
+        (base_rev, head_rev) = args.diff.split('..', 1)
+        print(json.dumps(
+            debops_keyring.diff_revisions(base_rev, head_rev),
+            indent=2,
+            sort_keys=True,
+        ))
+
+    working_tree_modes = (
+        args.output_file or args.show_output or args.consistency_check or
+        args.signer_report or args.benchmark_backends or expiry_modes or args.verify_history
+    )
+    if working_tree_modes:
+        debops_keyring.read_keyring_files('keyids', 'roles')
+
+    if expiry_modes:
+        key_expiry_timeline = debops_keyring.get_key_expiry_timeline()
+        if args.expiry_prom_file:
+            key_expiry_timeline.write_prometheus_metrics(args.expiry_prom_file)
+        if args.expiry_json_file:
+            key_expiry_timeline.write_json(args.expiry_json_file)
+        if args.expires_within is not None:
+            print(json.dumps(
+                key_expiry_timeline.get_expiring_within(args.expires_within),
+                indent=2,
+                sort_keys=True,
+            ))
+
+    if args.benchmark_backends:
+        print(json.dumps(
+            debops_keyring.benchmark_backends(),
+            indent=2,
+            sort_keys=True,
+        ))
+
+    if args.verify_history:
+        print(json.dumps(
+            debops_keyring.verify_git_history(),
+            indent=2,
+            sort_keys=True,
+        ))
+
+    if args.signer_report:
+        print(json.dumps(
+            debops_keyring.get_signer_report(),
+            indent=2,
+            sort_keys=True,
+        ))
 
     if args.consistency_check:
         if args.consistency_check_keyring:
@@ -574,10 +2349,12 @@ if __name__ == '__main__':
             )
         )
 
-    debops_keyring.read_gpg_output_for_pubkeys(debops_keyring._keyring_name)
-    logger.debug("debops_keyring._entities: {}".format(
-        pprint.pformat(debops_keyring._entities),
-    ))
+    if args.show_output or args.output_file:
+        debops_keyring.read_gpg_output_for_pubkeys(debops_keyring._keyring_name)
+        debops_keyring.read_certification_graph()
+        logger.debug("debops_keyring._entities: {}".format(
+            pprint.pformat(debops_keyring._entities),
+        ))
 
     if args.show_output:
         print(debops_keyring.get_entity_docs(
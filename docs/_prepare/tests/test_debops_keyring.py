@@ -5,19 +5,28 @@ from tempfile import TemporaryDirectory
 import time
 import shutil
 import subprocess
+import random
+import hashlib
 
 from nose.tools import assert_equals, raises
 from unittest import mock
 import git
 from gnupg import GPG
 
-from debops.keyring import Keyring
+from debops.keyring import (
+    Keyring, GnuPGBackend, PythonBackend, SignatureVerifier,
+    _parse_openpgp_keys, _iter_openpgp_packets, _dearmor_openpgp,
+)
 
 
 debops_keyring_gpg_test_dir = os.path.join(
     os.path.abspath(os.path.dirname(__file__)),
     'debops-keyring-gpg',
 )
+debops_keyring_gpg_dir = os.path.join(
+    os.path.abspath(os.path.dirname(__file__)),
+    '..', '..', '..', 'debops-keyring-gpg',
+)
 debops_keyring_fake_gnupg_home = os.path.join(
     os.path.abspath(os.path.dirname(__file__)),
     'fake_gnupg_home',
@@ -219,3 +228,889 @@ def test_check_git_commits_ok():
                 assert True
             else:
                 assert False
+
+
+def _write_keyring_files(repo_dir, keyids, roles):
+    with open(os.path.join(repo_dir, 'keyids'), 'w') as keyids_fh:
+        keyids_fh.write(keyids)
+    os.makedirs(os.path.join(repo_dir, 'roles'), exist_ok=True)
+    for (role_file, role) in Keyring._ROLE_FILES:
+        with open(os.path.join(repo_dir, 'roles', role_file), 'w') as role_fh:
+            role_fh.write(roles.get(role, ''))
+
+
+@mock.patch('time.time', mock.MagicMock(return_value=1506634371))
+def test_diff_revisions():
+    with TemporaryDirectory() as tmp_git_repo:
+        git_cmd = git.Git(tmp_git_repo)
+        git_cmd.init()
+        git_cmd.config(['user.email', 'debops-keyring-test@debops.org'])
+        git_cmd.config(['user.name', 'debops-keyring-test'])
+        tmp_keyring_dir = os.path.join(tmp_git_repo, 'debops-keyring-gpg')
+        os.mkdir(tmp_keyring_dir)
+        shutil.copy(
+            os.path.join(debops_keyring_gpg_test_dir, '0x2DCCF53E9BC74BEC'),
+            tmp_keyring_dir,
+        )
+        _write_keyring_files(
+            tmp_git_repo,
+            '0x2DCCF53E9BC74BEC Maciej Delmanowski <drybjed>\n',
+            {'contributor': 'Maciej Delmanowski <drybjed>\n'},
+        )
+        git_cmd.add(['.'])
+        git_cmd.commit(['--no-gpg-sign', '--message', 'Base'])
+        base_rev = git_cmd.rev_parse('HEAD')
+
+        debops_keyring = Keyring(
+            keyring_name=tmp_keyring_dir,
+        )
+        assert_equals(
+            {'added': [], 'removed': [], 'modified': []},
+            debops_keyring.diff_revisions(base_rev, 'HEAD', tmp_git_repo)['files'],
+        )
+
+        _write_keyring_files(
+            tmp_git_repo,
+            '0x2DCCF53E9BC74BEC Maciej Delmanowski <drybjed>\n',
+            {
+                'developer': 'Maciej Delmanowski <drybjed>\n',
+                'admin': 'Maciej Delmanowski <drybjed>\n',
+            },
+        )
+        git_cmd.add(['.'])
+        git_cmd.commit(['--no-gpg-sign', '--message', 'Promote'])
+        report = debops_keyring.diff_revisions(base_rev, 'HEAD', tmp_git_repo)
+        assert_equals(['drybjed'], report['entities']['modified'])
+        assert_equals(
+            {'drybjed': {'before': ['contributor'], 'after': ['admin', 'developer']}},
+            report['roles'],
+        )
+        assert_equals([], report['keys']['modified'])
+        promote_rev = git_cmd.rev_parse('HEAD')
+
+        # Removing a public key which is still referenced must be detected.
+        git_cmd.rm([os.path.join(tmp_keyring_dir, '0x2DCCF53E9BC74BEC')])
+        git_cmd.commit(['--no-gpg-sign', '--message', 'Remove key'])
+        try:
+            debops_keyring.diff_revisions(promote_rev, 'HEAD', tmp_git_repo)
+            assert False
+        except Exception as e:
+            assert 'still used by entity drybjed' in str(e)
+
+        # A change which fixes a broken base revision must pass.
+        os.makedirs(tmp_keyring_dir, exist_ok=True)
+        shutil.copy(
+            os.path.join(debops_keyring_gpg_test_dir, '0x2DCCF53E9BC74BEC'),
+            tmp_keyring_dir,
+        )
+        _write_keyring_files(
+            tmp_git_repo,
+            '0x2DCCF53E9BC74BEC Maciej Delmanowski <drybjed>\n',
+            {
+                'developer': 'Maciej Delmanowski <drybjed>\n',
+                'leader': 'Maciej D <drybjed>\n',
+            },
+        )
+        git_cmd.add(['.'])
+        git_cmd.commit(['--no-gpg-sign', '--message', 'Broken leader'])
+        broken_rev = git_cmd.rev_parse('HEAD')
+        try:
+            debops_keyring.diff_revisions(promote_rev, broken_rev, tmp_git_repo)
+            assert False
+        except Exception as e:
+            assert 'roles/leader:1: Name mismatch' in str(e)
+        _write_keyring_files(
+            tmp_git_repo,
+            '0x2DCCF53E9BC74BEC Maciej Delmanowski <drybjed>\n',
+            {
+                'developer': 'Maciej Delmanowski <drybjed>\n',
+                'leader': 'Maciej Delmanowski <drybjed>\n',
+            },
+        )
+        git_cmd.add(['.'])
+        git_cmd.commit(['--no-gpg-sign', '--message', 'Fix leader'])
+        report = debops_keyring.diff_revisions(broken_rev, 'HEAD', tmp_git_repo)
+        assert_equals(['roles/leader'], report['files']['modified'])
+        assert_equals([], report['entities']['modified'])
+
+        # A relative keyring name is resolved against the repository and not
+        # against the current working directory.
+        debops_keyring = Keyring(
+            keyring_name='debops-keyring-gpg',
+        )
+        report = debops_keyring.diff_revisions(base_rev, 'HEAD', tmp_git_repo)
+        assert_equals(['drybjed'], report['entities']['modified'])
+        assert_equals([], report['files']['added'] + report['files']['removed'])
+
+
+def test_certification_graph():
+    for backend_class in [GnuPGBackend, PythonBackend]:
+        _check_certification_graph(backend_class)
+
+
+def _check_certification_graph(backend_class):
+    debops_keyring = Keyring(
+        keyring_name=debops_keyring_gpg_dir,
+        backend=backend_class.name,
+    )
+    # The public keys of ypid certify each other. Split them into separate
+    # entities to get certifications between entities. The certifications
+    # were made while the signer keys were valid and are used after the
+    # keys have expired.
+    debops_keyring._read_keyids_lines([
+        '0x2DCCF53E9BC74BEC Maciej Delmanowski <drybjed>',
+        '0x86FD980BBF1A40F8 Robin Schneider <ypid>',
+        '0x5FE92C12EE88E1F0 Robin Schneider Release <ypid_release>',
+        '0x489A4D5EC353C98A Robin Schneider Automatic <ypid_auto>',
+    ], 'keyids')
+    debops_keyring._read_entity_role_lines([
+        'Robin Schneider <ypid>',
+    ], 'roles/admins', 'admin')
+    graph = debops_keyring.read_certification_graph()
+    assert_equals(['ypid_auto', 'ypid_release'], graph.get_certifies('ypid'))
+    assert_equals(['ypid_auto', 'ypid_release'], graph.get_certified_by('ypid'))
+    assert_equals([], graph.get_certified_by('drybjed'))
+    assert_equals(
+        ['ypid_release', 'ypid', 'ypid_auto'],
+        debops_keyring.get_certification_path('ypid_release', 'ypid_auto'),
+    )
+    assert_equals(None, debops_keyring.get_certification_path('drybjed', 'ypid'))
+    assert_equals(['drybjed'], debops_keyring.get_entities_not_certified_by_role('admin'))
+    assert_equals(['ypid'], debops_keyring._entities['ypid_auto']['certified_by'])
+
+
+def _init_signed_git_repo(tmp_git_repo):
+    """
+    Prepare a git repository which signs commits with the test key from
+    the fake GnuPG home. Returns the git command, the keyring directory
+    containing the exported public key and the fingerprint of the key.
+    """
+    gpg_tmp_home = os.path.join(tmp_git_repo, 'gpg_tmp_home')
+    shutil.copytree(debops_keyring_fake_gnupg_home, gpg_tmp_home)
+    os.chmod(gpg_tmp_home, 0o700)
+    gpg = GPG(gnupghome=gpg_tmp_home)
+    gpg_key_fingerprint = gpg.list_keys()[0]['fingerprint']
+    gpg_edit_key_cmd = subprocess.Popen(
+        ['gpg', '--homedir', gpg_tmp_home, '--command-fd', '0', '--batch', '--edit-key', gpg_key_fingerprint],
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+    )
+    gpg_edit_key_cmd.communicate(input='expire\n0\nsave\n'.encode(), timeout=5)
+
+    tmp_keyring_dir = os.path.join(tmp_git_repo, 'tmp-keyring-gpg')
+    os.mkdir(tmp_keyring_dir)
+    with open(os.path.join(tmp_keyring_dir, '0x' + gpg_key_fingerprint[-16:].upper()), 'w') as tmp_pubkey_fh:
+        tmp_pubkey_fh.write(gpg.export_keys(gpg_key_fingerprint))
+
+    git_cmd = git.Git(tmp_git_repo)
+    git_cmd.init()
+    git_cmd.config(['user.signingkey', gpg_key_fingerprint])
+    git_cmd.config(['user.email', 'debops-keyring-test@debops.org'])
+    git_cmd.config(['user.name', 'debops-keyring-test'])
+    git_cmd.update_environment(GNUPGHOME=gpg_tmp_home)
+    return (git_cmd, tmp_keyring_dir, gpg_key_fingerprint)
+
+
+def _gpg_quick_gen_key(gpg_home, uid, expire='never', faked_time=None):
+    """
+    Generate a Ed25519 signing key without passphrase and return its
+    fingerprint.
+    """
+    gpg_args = ['gpg', '--homedir', gpg_home, '--batch', '--passphrase', '']
+    if faked_time is not None:
+        gpg_args.extend(['--faked-system-time', str(faked_time)])
+    subprocess.check_call(
+        gpg_args + ['--quick-gen-key', uid, 'ed25519', 'sign', expire],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    return [x['fingerprint'] for x in GPG(gnupghome=gpg_home).list_keys() if uid in x['uids']][0]
+
+
+def _commit_new_file_content(git_cmd, tmp_git_repo, commit_args):
+    tmp_git_file = os.path.join(tmp_git_repo, 'new-file')
+    with open(tmp_git_file, 'w') as tmp_git_fh:
+        tmp_git_fh.write(str(time.time()))
+    git_cmd.add([tmp_git_file])
+    git_cmd.commit(commit_args)
+
+
+def test_get_signer_report():
+    with TemporaryDirectory() as tmp_git_repo:
+        (git_cmd, tmp_keyring_dir, gpg_key_fingerprint) = _init_signed_git_repo(tmp_git_repo)
+        _commit_new_file_content(git_cmd, tmp_git_repo, ['--gpg-sign', '--message', 'Signed commit'])
+        _commit_new_file_content(git_cmd, tmp_git_repo, ['--gpg-sign', '--message', 'Signed commit'])
+        _commit_new_file_content(git_cmd, tmp_git_repo, ['--no-gpg-sign', '--message', 'Unsigned commit'])
+
+        debops_keyring = Keyring(
+            keyring_name=tmp_keyring_dir,
+        )
+        debops_keyring._read_keyids_lines([
+            '0x{} Test Key <test>'.format(gpg_key_fingerprint[-16:]),
+        ], 'keyids')
+        debops_keyring._read_entity_role_lines(['Test Key <test>'], 'roles/contributors', 'contributor')
+
+        report = debops_keyring.get_signer_report(tmp_git_repo)
+        assert_equals(3, report['commits'])
+        assert_equals(1, report['unsigned'])
+        assert_equals(['test'], list(report['entities'].keys()))
+        assert_equals(2, report['entities']['test']['commits'])
+        assert_equals(2, len(report['flagged']))
+        assert 'not member of any of the roles' in report['flagged'][0]['reason']
+
+        report = debops_keyring.get_signer_report(tmp_git_repo, signer_roles=['contributor'])
+        assert_equals([], report['flagged'])
+
+
+def _init_flagged_signatures_git_repo(tmp_git_repo):
+    """
+    Prepare a git repository with commits whose signatures are reported by
+    :command:`git log --format=%G?` as E, Y, X and R in this order. Returns
+    the git command, the keyring directory, the keyids and developer role
+    lines and the fingerprint of the key which is not in the keyring.
+    """
+    (git_cmd, tmp_keyring_dir, gpg_key_fingerprint) = _init_signed_git_repo(tmp_git_repo)
+    gpg_tmp_home = os.path.join(tmp_git_repo, 'gpg_tmp_home')
+    gpg = GPG(gnupghome=gpg_tmp_home)
+    past_time = int(time.time()) - 3 * 24 * 60 * 60
+
+    # Signature by a key which is not contained in the keyring.
+    unknown_fingerprint = _gpg_quick_gen_key(gpg_tmp_home, 'debops-keyring-test-unknown')
+    _commit_new_file_content(git_cmd, tmp_git_repo, ['--gpg-sign={}'.format(unknown_fingerprint), '-m', 'E'])
+
+    # Signature made in the past by a key which has expired since.
+    expired_fingerprint = _gpg_quick_gen_key(
+        gpg_tmp_home, 'debops-keyring-test-expired', expire='1d', faked_time=past_time,
+    )
+    with open(os.path.join(gpg_tmp_home, 'gpg.conf'), 'w') as gpg_conf_fh:
+        gpg_conf_fh.write('faked-system-time {}\n'.format(past_time))
+    _commit_new_file_content(git_cmd, tmp_git_repo, ['--gpg-sign={}'.format(expired_fingerprint), '-m', 'Y'])
+
+    # Signature which expired after one day.
+    with open(os.path.join(gpg_tmp_home, 'gpg.conf'), 'a') as gpg_conf_fh:
+        gpg_conf_fh.write('default-sig-expire 1d\n')
+    _commit_new_file_content(git_cmd, tmp_git_repo, ['--gpg-sign', '-m', 'X'])
+    os.remove(os.path.join(gpg_tmp_home, 'gpg.conf'))
+
+    # Signature by a key which has been revoked since.
+    revoked_fingerprint = _gpg_quick_gen_key(gpg_tmp_home, 'debops-keyring-test-revoked')
+    _commit_new_file_content(git_cmd, tmp_git_repo, ['--gpg-sign={}'.format(revoked_fingerprint), '-m', 'R'])
+    with open(os.path.join(gpg_tmp_home, 'openpgp-revocs.d', revoked_fingerprint + '.rev')) as revocation_fh:
+        # The armor header is escaped to prevent accidental imports.
+        gpg.import_keys(revocation_fh.read().replace(':-----BEGIN', '-----BEGIN'))
+
+    keyids_lines = ['0x{} Test Key <test>'.format(gpg_key_fingerprint[-16:])]
+    role_lines = ['Test Key <test>']
+    for (fingerprint, nick) in [(expired_fingerprint, 'expired'), (revoked_fingerprint, 'revoked')]:
+        with open(os.path.join(tmp_keyring_dir, '0x' + fingerprint[-16:]), 'w') as tmp_pubkey_fh:
+            tmp_pubkey_fh.write(gpg.export_keys(fingerprint))
+        keyids_lines.append('0x{} Test Key <{}>'.format(fingerprint[-16:], nick))
+        role_lines.append('Test Key <{}>'.format(nick))
+
+    return (git_cmd, tmp_keyring_dir, keyids_lines, role_lines, unknown_fingerprint)
+
+
+def test_get_signer_report_flagged_signatures():
+    with TemporaryDirectory() as tmp_git_repo:
+        (git_cmd, tmp_keyring_dir, keyids_lines, role_lines, unknown_fingerprint) = \
+            _init_flagged_signatures_git_repo(tmp_git_repo)
+        debops_keyring = Keyring(
+            keyring_name=tmp_keyring_dir,
+        )
+        debops_keyring._read_keyids_lines(keyids_lines, 'keyids')
+        debops_keyring._read_entity_role_lines(role_lines, 'roles/developers', 'developer')
+        report = debops_keyring.get_signer_report(tmp_git_repo)
+        assert_equals(4, report['commits'])
+        assert_equals(['expired', 'revoked', 'test'], sorted(report['entities'].keys()))
+        assert_equals(
+            [
+                'signing key revoked',
+                'signature expired',
+                'signing key expired',
+                'signing key not in keyring',
+            ],
+            [x['reason'] for x in report['flagged']],
+        )
+        assert_equals(unknown_fingerprint[-16:], report['flagged'][-1]['keyid'])
+
+
+def test_openpgp_backends_list_keys_equal():
+    # Not run at a mocked point in time. The keyring contains expired keys
+    # and the result must not depend on the order of the imports.
+    for import_order in [sorted, lambda x: sorted(x, reverse=True)]:
+        keys_by_backend = {}
+        for backend_class in [GnuPGBackend, PythonBackend]:
+            with backend_class() as backend:
+                for long_key_id in import_order(os.listdir(debops_keyring_gpg_dir)):
+                    with open(os.path.join(debops_keyring_gpg_dir, long_key_id), 'rb') as pubkey_fh:
+                        backend.import_keys(pubkey_fh.read())
+                keys_by_backend[backend_class.name] = backend.list_keys(sigs=True)
+        assert_equals(5, len(keys_by_backend['gnupg']))
+        assert_equals(keys_by_backend['gnupg'], keys_by_backend['python'])
+
+
+@mock.patch('time.time', mock.MagicMock(return_value=1506634372))
+@raises(Exception)
+def test_check_openpgp_pubkey_expired_python_backend():
+    debops_keyring = Keyring(backend='python')
+    long_key_id = '0x2DCCF53E9BC74BEC'
+    assert debops_keyring._check_openpgp_pubkey_from_file(
+        os.path.join(debops_keyring_gpg_test_dir, long_key_id),
+        long_key_id,
+    )
+
+
+def test_benchmark_backends():
+    debops_keyring = Keyring(
+        strict=False,
+        keyring_name=debops_keyring_gpg_dir,
+    )
+    timings = debops_keyring.benchmark_backends(rounds=1)
+    assert_equals(['gnupg', 'python'], sorted(timings.keys()))
+
+
+def test_key_expiry_timeline():
+    debops_keyring = Keyring(
+        keyring_name=debops_keyring_gpg_dir,
+    )
+    debops_keyring._read_keyids_lines([
+        '0x2DCCF53E9BC74BEC Maciej Delmanowski <drybjed>',
+        '0x489A4D5EC353C98A Robin Schneider <ypid>',
+    ], 'keyids')
+    with mock.patch.object(GnuPGBackend, 'import_keys', autospec=True,
+                           side_effect=GnuPGBackend.import_keys) as import_keys:
+        key_expiry_timeline = debops_keyring.get_key_expiry_timeline()
+    # All public keys are imported at once.
+    assert_equals(1, import_keys.call_count)
+    assert_equals(
+        [
+            ('drybjed', 'primary', 1506634371),
+            ('drybjed', 'signing_subkey', 1506634411),
+            ('ypid', 'primary', 1528734336),
+            ('ypid', 'signing_subkey', 1528734382),
+        ],
+        [(x['nick'], x['type'], x['expires']) for x in key_expiry_timeline.get_entries()],
+    )
+    assert_equals([], key_expiry_timeline.get_expiring_within(30, now=1400000000))
+    assert_equals(
+        ['27067A91D620EE91D50309D92DCCF53E9BC74BEC', 'CAC76F1C774AD50FD129B92F375A77ECA0A04619'],
+        [x['fingerprint'] for x in key_expiry_timeline.get_expiring_within(1, now=1506600000)],
+    )
+
+    with TemporaryDirectory() as tmp_dir:
+        prom_file = os.path.join(tmp_dir, 'debops_keyring.prom')
+        key_expiry_timeline.write_prometheus_metrics(prom_file)
+        with open(prom_file) as prom_fh:
+            prom_lines = prom_fh.read().split('\n')
+        assert_equals('# TYPE debops_keyring_key_expiry_timestamp_seconds gauge', prom_lines[1])
+        assert_equals(
+            'debops_keyring_key_expiry_timestamp_seconds{nick="drybjed",keyid="0x2DCCF53E9BC74BEC",'
+            'fingerprint="27067A91D620EE91D50309D92DCCF53E9BC74BEC",type="primary"} 1506634371',
+            prom_lines[2],
+        )
+        assert_equals(['debops_keyring.prom'], os.listdir(tmp_dir))
+
+
+def test_signature_verifier_git_commits():
+    with TemporaryDirectory() as tmp_git_repo:
+        (git_cmd, tmp_keyring_dir, gpg_key_fingerprint) = _init_signed_git_repo(tmp_git_repo)
+        _commit_new_file_content(git_cmd, tmp_git_repo, ['--gpg-sign', '--message', 'Signed commit'])
+        _commit_new_file_content(git_cmd, tmp_git_repo, ['--no-gpg-sign', '--message', 'Unsigned commit'])
+        _commit_new_file_content(git_cmd, tmp_git_repo, ['--gpg-sign', '--message', 'Signed commit'])
+
+        debops_keyring = Keyring(
+            keyring_name=tmp_keyring_dir,
+        )
+        signature_verifier = debops_keyring.get_signature_verifier()
+        gpg_verdicts = [x.split(' ') for x in git_cmd.log('--format=%H %G?').split('\n')]
+        results = list(signature_verifier.verify_git_objects(
+            tmp_git_repo,
+            [x[0] for x in gpg_verdicts],
+        ))
+        assert_equals(
+            [x[0] for x in gpg_verdicts],
+            [x['object'] for x in results],
+        )
+        for (gpg_verdict, result) in zip(gpg_verdicts, results):
+            assert_equals(gpg_verdict[1] in ['G', 'U'], result['fingerprint'] is not None)
+
+        report = debops_keyring.verify_git_history(tmp_git_repo)
+        assert_equals(3, report['commits'])
+        assert_equals(2, report['verified'])
+        assert_equals([gpg_verdicts[1][0]], report['unsigned'])
+
+        # A modified payload must not verify.
+        (hexsha, object_type, size, commit_content) = git.Repo(tmp_git_repo).git.get_object_data('HEAD')
+        (payload, signature) = signature_verifier._split_git_object(object_type, commit_content)
+        assert signature_verifier.verify(payload, signature) is not None
+        assert_equals(None, signature_verifier.verify(payload.replace(b'Signed', b'Forged'), signature))
+
+
+def test_signature_verifier_ed25519():
+    with TemporaryDirectory() as gpg_tmp_home:
+        subprocess.check_call(
+            ['gpg', '--homedir', gpg_tmp_home, '--batch', '--passphrase', '',
+             '--quick-gen-key', 'debops-keyring-test-ed25519', 'ed25519', 'sign', 'never'],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        gpg = GPG(gnupghome=gpg_tmp_home)
+        gpg_key_fingerprint = gpg.list_keys()[0]['fingerprint']
+        data = b'debops-keyring\n'
+        gpg_sign_cmd = subprocess.Popen(
+            ['gpg', '--homedir', gpg_tmp_home, '--batch', '--armor', '--detach-sign'],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        )
+        (signature, gpg_sign_cmd_stderr) = gpg_sign_cmd.communicate(input=data, timeout=5)
+
+        for backend_class in [GnuPGBackend, PythonBackend]:
+            with backend_class() as backend:
+                backend.import_keys(gpg.export_keys(gpg_key_fingerprint).encode())
+                assert_equals(gpg_key_fingerprint, backend.verify(data, signature))
+                assert_equals(None, backend.verify(b'debops-keyring-forged\n', signature))
+
+
+def test_read_keyring_files_reports_all_problems():
+    with TemporaryDirectory() as tmp_dir:
+        _write_keyring_files(
+            tmp_dir,
+            '0x2DCCF53E9BC74BEC Maciej Delmanowski <drybjed>\n'
+            'not a keyids line\n'
+            '0x2dccf53e9bc74bec Robin Schneider <ypid>\n'
+            '0x86FD980BBF1A40F8 Robin Schneider <ypid>\n'
+            '0x5FE92C12EE88E1F0 Robin S. <ypid>\n',
+            {
+                'developer': 'Maciej Delmanowski <drybjed>\nRobin Schneider <ypid>\nRobin Schneider <ypid>\n',
+                'contributor': 'Someone Else <unknown>\nmalformed\n',
+                'admin': 'Maciej D. <drybjed>\n',
+            },
+        )
+        debops_keyring = Keyring()
+        try:
+            debops_keyring.read_keyring_files(
+                os.path.join(tmp_dir, 'keyids'),
+                os.path.join(tmp_dir, 'roles'),
+            )
+            assert False
+        except Exception as e:
+            error_lines = str(e).split('\n')[1:]
+        expected_errors = [
+            ('keyids', 2, 'Malformed line'),
+            ('keyids', 3, 'Duplicate key ID'),
+            ('keyids', 5, 'Conflicting name'),
+            ('roles/admins', 1, 'Name mismatch'),
+            ('roles/developers', 3, 'listed more than once'),
+            ('roles/contributors', 1, 'not present in given keyid file'),
+            ('roles/contributors', 2, 'Malformed line'),
+        ]
+        assert_equals(len(expected_errors), len(error_lines))
+        for ((file_name, line_number, message), error_line) in zip(expected_errors, error_lines):
+            assert error_line.startswith('{}:{}: '.format(os.path.join(tmp_dir, file_name), line_number))
+            assert message in error_line
+
+
+def test_read_keyring_files_not_strict_allows_name_mismatch():
+    with TemporaryDirectory() as tmp_dir:
+        _write_keyring_files(
+            tmp_dir,
+            '0x2DCCF53E9BC74BEC Maciej Delmanowski <drybjed>\n',
+            {'developer': 'Maciej D. <drybjed>\n'},
+        )
+        debops_keyring = Keyring(strict=False)
+        debops_keyring.read_keyring_files(
+            os.path.join(tmp_dir, 'keyids'),
+            os.path.join(tmp_dir, 'roles'),
+        )
+        assert debops_keyring.entity_is_member_of('drybjed', 'developer')
+
+
+def _is_probable_prime(candidate, rng):
+    (d, r) = (candidate - 1, 0)
+    while d % 2 == 0:
+        (d, r) = (d // 2, r + 1)
+    for _ in range(20):
+        x = pow(rng.randrange(2, candidate - 1), d, candidate)
+        if x in [1, candidate - 1]:
+            continue
+        for _ in range(r - 1):
+            x = pow(x, 2, candidate)
+            if x == candidate - 1:
+                break
+        else:
+            return False
+    return True
+
+
+def _mod_inverse(value, modulus):
+    (old_r, r, old_s, s) = (value, modulus, 1, 0)
+    while r != 0:
+        quotient = old_r // r
+        (old_r, r) = (r, old_r - quotient * r)
+        (old_s, s) = (s, old_s - quotient * s)
+    return old_s % modulus
+
+
+def _openpgp_packet(tag, body):
+    return bytes([0xc0 | tag, 0xff]) + len(body).to_bytes(4, 'big') + body
+
+
+def _openpgp_mpi(value):
+    return value.bit_length().to_bytes(2, 'big') + value.to_bytes((value.bit_length() + 7) // 8, 'big')
+
+
+def _make_rsa_test_key(seed, created=1500000000, bits=1024):
+    """
+    Deterministic RSA key to build OpenPGP test vectors which GnuPG can not
+    create (anymore).
+    """
+    rng = random.Random(seed)
+    e = 65537
+    primes = []
+    while len(primes) < 2:
+        candidate = rng.getrandbits(bits // 2) | (3 << (bits // 2 - 2)) | 1
+        if (candidate - 1) % e != 0 and _is_probable_prime(candidate, rng):
+            primes.append(candidate)
+    n = primes[0] * primes[1]
+    body = b'\x04' + created.to_bytes(4, 'big') + b'\x01' + _openpgp_mpi(n) + _openpgp_mpi(e)
+    hash_prefix = b'\x99' + len(body).to_bytes(2, 'big') + body
+    return {
+        'n': n,
+        'e': e,
+        'd': _mod_inverse(e, (primes[0] - 1) * (primes[1] - 1)),
+        'body': body,
+        'hash_prefix': hash_prefix,
+        'fingerprint': hashlib.sha1(hash_prefix).hexdigest().upper(),
+        'keyid': hashlib.sha1(hash_prefix).digest()[-8:],
+    }
+
+
+def _rsa_signature_packet(rsa_key, sig_type, signed_data, created=1500000000, version=4, hashed_subpackets=b'',
+                          unhashed_subpackets=b''):
+    digest_info = bytes.fromhex('3031300d060960864801650304020105000420')
+    if version == 3:
+        hashed_data = bytes([sig_type]) + created.to_bytes(4, 'big')
+        digest = hashlib.sha256(signed_data + hashed_data).digest()
+    else:
+        subpackets = bytes([5, 2]) + created.to_bytes(4, 'big') + bytes([9, 16]) + rsa_key['keyid'] + hashed_subpackets
+        hashed_data = bytes([4, sig_type, 1, 8]) + len(subpackets).to_bytes(2, 'big') + subpackets
+        digest = hashlib.sha256(
+            signed_data + hashed_data + b'\x04\xff' + len(hashed_data).to_bytes(4, 'big')
+        ).digest()
+    key_length = (rsa_key['n'].bit_length() + 7) // 8
+    encoded_message = b'\x00\x01' + b'\xff' * (key_length - len(digest_info) - len(digest) - 3) + \
+        b'\x00' + digest_info + digest
+    signature_value = pow(int.from_bytes(encoded_message, 'big'), rsa_key['d'], rsa_key['n'])
+    if version == 3:
+        body = b'\x03\x05' + hashed_data + rsa_key['keyid'] + b'\x01\x08' + digest[:2] + _openpgp_mpi(signature_value)
+    else:
+        body = hashed_data + len(unhashed_subpackets).to_bytes(2, 'big') + unhashed_subpackets + \
+            digest[:2] + _openpgp_mpi(signature_value)
+    return _openpgp_packet(2, body)
+
+
+def _openpgp_subpacket(subpacket_type, data):
+    return b'\xff' + (len(data) + 1).to_bytes(4, 'big') + bytes([subpacket_type]) + data
+
+
+def _uid_hash_data(uid):
+    return b'\xb4' + len(uid).to_bytes(4, 'big') + uid
+
+
+def _make_rsa_transferable_key(rsa_key, uid, key_flags=0x03, hashed_subpackets=b''):
+    return (
+        _openpgp_packet(6, rsa_key['body']) +
+        _openpgp_packet(13, uid) +
+        _rsa_signature_packet(
+            rsa_key, 0x13,
+            rsa_key['hash_prefix'] + _uid_hash_data(uid),
+            hashed_subpackets=bytes([2, 27, key_flags]) + hashed_subpackets,
+        )
+    )
+
+
+def test_signature_verifier_v3_signature():
+    rsa_key = _make_rsa_test_key(1)
+    key_data = _make_rsa_transferable_key(rsa_key, b'debops-keyring-test-v3')
+    data = b'debops-keyring\n'
+    signature = _rsa_signature_packet(rsa_key, 0x00, data, version=3)
+
+    signature_verifier = SignatureVerifier(_parse_openpgp_keys(key_data))
+    assert_equals(rsa_key['fingerprint'], signature_verifier.verify(data, signature))
+    assert_equals(None, signature_verifier.verify(b'debops-keyring-forged\n', signature))
+    with GnuPGBackend() as backend:
+        backend.import_keys(key_data)
+        assert_equals(rsa_key['fingerprint'], backend.verify(data, signature))
+
+
+def test_signature_verifier_signature_made_before_key_creation():
+    rsa_key = _make_rsa_test_key(1)
+    key_data = _make_rsa_transferable_key(rsa_key, b'debops-keyring-test')
+    data = b'debops-keyring\n'
+    signature = _rsa_signature_packet(rsa_key, 0x00, data, created=1400000000)
+
+    signature_verifier = SignatureVerifier(_parse_openpgp_keys(key_data))
+    assert_equals(
+        {'fingerprint': rsa_key['fingerprint'], 'created': 1400000000, 'status': 'not-yet-valid'},
+        signature_verifier.verify_signature(data, signature),
+    )
+    assert_equals(None, signature_verifier.verify(data, signature))
+    with GnuPGBackend() as backend:
+        backend.import_keys(key_data)
+        assert_equals(None, backend.verify(data, signature))
+
+
+def test_signature_verifier_invalid_signature_data():
+    rsa_key = _make_rsa_test_key(1)
+    signature_verifier = SignatureVerifier(_parse_openpgp_keys(
+        _make_rsa_transferable_key(rsa_key, b'debops-keyring-test')
+    ))
+    data = b'debops-keyring\n'
+    signature = _rsa_signature_packet(rsa_key, 0x00, data)
+    assert signature_verifier.verify(data, signature) is not None
+    assert_equals(None, signature_verifier.verify(data, signature[:-20]))
+    assert_equals(None, signature_verifier.verify(
+        data,
+        b'-----BEGIN SSH SIGNATURE-----\nU1NIU0lHAAAAAQ==\n-----END SSH SIGNATURE-----\n',
+    ))
+
+
+def test_signature_verifier_subkey_without_primary_key_binding():
+    primary_key = _make_rsa_test_key(5)
+    subkey = _make_rsa_test_key(6)
+    subkey_hash_data = primary_key['hash_prefix'] + subkey['hash_prefix']
+    primary_key_binding = _rsa_signature_packet(subkey, 0x19, subkey_hash_data)
+    data = b'debops-keyring\n'
+    signature = _rsa_signature_packet(subkey, 0x00, data)
+    for (embedded_signatures, expected_fingerprint) in [
+        # Packet header of the primary key binding signature stripped.
+        (_openpgp_subpacket(32, primary_key_binding[6:]), subkey['fingerprint']),
+        (b'', None),
+    ]:
+        key_data = (
+            _make_rsa_transferable_key(primary_key, b'debops-keyring-test') +
+            _openpgp_packet(14, subkey['body']) +
+            _rsa_signature_packet(
+                primary_key, 0x18, subkey_hash_data,
+                hashed_subpackets=bytes([2, 27, 0x02]),
+                unhashed_subpackets=embedded_signatures,
+            )
+        )
+        assert_equals(expected_fingerprint, SignatureVerifier(_parse_openpgp_keys(key_data)).verify(data, signature))
+        for backend_class in [GnuPGBackend, PythonBackend]:
+            with backend_class() as backend:
+                backend.import_keys(key_data)
+                assert_equals(expected_fingerprint, backend.verify(data, signature))
+
+
+def test_signature_verifier_unbound_subkey():
+    with TemporaryDirectory() as tmp_git_repo:
+        (git_cmd, tmp_keyring_dir, gpg_key_fingerprint) = _init_signed_git_repo(tmp_git_repo)
+        gpg_tmp_home = os.path.join(tmp_git_repo, 'gpg_tmp_home')
+        attacker_fingerprint = _gpg_quick_gen_key(gpg_tmp_home, 'debops-keyring-test-attacker')
+        gpg = GPG(gnupghome=gpg_tmp_home)
+        attacker_key_body = [
+            body for (tag, body) in _iter_openpgp_packets(
+                _dearmor_openpgp(gpg.export_keys(attacker_fingerprint).encode())
+            ) if tag == 6
+        ][0]
+
+        # Append the public key of the attacker as subkey without binding
+        # signature to the public key in the keyring.
+        pubkey_file = os.path.join(tmp_keyring_dir, os.listdir(tmp_keyring_dir)[0])
+        with open(pubkey_file, 'rb') as pubkey_fh:
+            pubkey_data = _dearmor_openpgp(pubkey_fh.read())
+        with open(pubkey_file, 'wb') as pubkey_fh:
+            pubkey_fh.write(pubkey_data + _openpgp_packet(14, attacker_key_body))
+
+        _commit_new_file_content(
+            git_cmd, tmp_git_repo,
+            ['--gpg-sign={}'.format(attacker_fingerprint), '--message', 'Signed by attacker'],
+        )
+
+        gpg_check_home = os.path.join(tmp_git_repo, 'gpg_check_home')
+        os.mkdir(gpg_check_home, 0o700)
+        subprocess.check_call(
+            ['gpg', '--homedir', gpg_check_home, '--batch', '--import', pubkey_file],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        git_cmd.update_environment(GNUPGHOME=gpg_check_home)
+        gpg_verdict = git_cmd.log('-1', '--format=%G?')
+        assert gpg_verdict not in ['G', 'U']
+
+        debops_keyring = Keyring(
+            keyring_name=tmp_keyring_dir,
+        )
+        report = debops_keyring.verify_git_history(tmp_git_repo)
+        assert_equals(0, report['verified'])
+        assert_equals(1, len(report['unverified']))
+
+
+def test_check_openpgp_pubkey_self_signature_verified():
+    rsa_key = _make_rsa_test_key(2, bits=2048)
+    long_key_id = '0x' + rsa_key['keyid'].hex().upper()
+    # Key expiration time of one day.
+    key_expires_subpacket = bytes([5, 9]) + (24 * 60 * 60).to_bytes(4, 'big')
+    key_data = _make_rsa_transferable_key(
+        rsa_key, b'debops-keyring-test', hashed_subpackets=key_expires_subpacket,
+    )
+    # Remove the expiration date without updating the self-signature.
+    tampered_key_data = key_data.replace(key_expires_subpacket, bytes([5, 9, 0, 0, 0, 0]))
+    revoked_key_data = (
+        _openpgp_packet(6, rsa_key['body']) +
+        _rsa_signature_packet(rsa_key, 0x20, rsa_key['hash_prefix']) +
+        _make_rsa_transferable_key(rsa_key, b'debops-keyring-test')[len(_openpgp_packet(6, rsa_key['body'])):]
+    )
+    with TemporaryDirectory() as tmp_keyring_dir:
+        pubkey_file = os.path.join(tmp_keyring_dir, long_key_id)
+        for (pubkey_data, expected_error) in [
+            (key_data, 'contains a expired OpenPGP key'),
+            (tampered_key_data, 'contains no OpenPGP keys'),
+            (revoked_key_data, 'contains a revoked OpenPGP key'),
+        ]:
+            with open(pubkey_file, 'wb') as pubkey_fh:
+                pubkey_fh.write(pubkey_data)
+            for backend_class in [GnuPGBackend, PythonBackend]:
+                debops_keyring = Keyring(
+                    keyring_name=tmp_keyring_dir,
+                    backend=backend_class.name,
+                )
+                try:
+                    debops_keyring._check_openpgp_pubkey_from_file(pubkey_file, long_key_id)
+                    assert False
+                except Exception as e:
+                    assert expected_error in str(e), (backend_class.name, str(e))
+
+
+def test_certification_graph_transplanted_signature():
+    with TemporaryDirectory() as tmp_keyring_dir:
+        for long_key_id in ['0x86FD980BBF1A40F8', '0x5FE92C12EE88E1F0']:
+            shutil.copy(os.path.join(debops_keyring_gpg_dir, long_key_id), tmp_keyring_dir)
+        # Copy the certification of ypid by ypid_release onto the UID of
+        # le9i0nx.
+        with open(os.path.join(debops_keyring_gpg_dir, '0x86FD980BBF1A40F8'), 'rb') as pubkey_fh:
+            transplanted_sig_body = [
+                body for (tag, body) in _iter_openpgp_packets(_dearmor_openpgp(pubkey_fh.read()))
+                if tag == 2 and bytes.fromhex('5FE92C12EE88E1F0') in body
+            ][0]
+        pubkey_data = b''
+        with open(os.path.join(debops_keyring_gpg_dir, '0xDAA9DC5E750C1E85'), 'rb') as pubkey_fh:
+            for (tag, body) in _iter_openpgp_packets(_dearmor_openpgp(pubkey_fh.read())):
+                pubkey_data += _openpgp_packet(tag, body)
+                if tag == 13:
+                    pubkey_data += _openpgp_packet(2, transplanted_sig_body)
+        with open(os.path.join(tmp_keyring_dir, '0xDAA9DC5E750C1E85'), 'wb') as pubkey_fh:
+            pubkey_fh.write(pubkey_data)
+
+        for backend_class in [GnuPGBackend, PythonBackend]:
+            debops_keyring = Keyring(
+                keyring_name=tmp_keyring_dir,
+                backend=backend_class.name,
+            )
+            debops_keyring._read_keyids_lines([
+                '0x86FD980BBF1A40F8 Robin Schneider <ypid>',
+                '0x5FE92C12EE88E1F0 Robin Schneider Release <ypid_release>',
+                '0xDAA9DC5E750C1E85 Alexey Gavrilov <le9i0nx>',
+            ], 'keyids')
+            graph = debops_keyring.read_certification_graph()
+            assert_equals(['ypid'], graph.get_certifies('ypid_release'))
+            assert_equals([], graph.get_certified_by('le9i0nx'))
+
+
+def test_certification_graph_revoked_certification():
+    signer_key = _make_rsa_test_key(3)
+    signee_key = _make_rsa_test_key(4)
+    signee_uid = b'debops-keyring-test-signee'
+    certification = _rsa_signature_packet(
+        signer_key, 0x10, signee_key['hash_prefix'] + _uid_hash_data(signee_uid),
+    )
+    revocation = _rsa_signature_packet(
+        signer_key, 0x30, signee_key['hash_prefix'] + _uid_hash_data(signee_uid),
+        created=1500000100,
+    )
+    with TemporaryDirectory() as tmp_keyring_dir:
+        with open(os.path.join(tmp_keyring_dir, '0x' + signer_key['keyid'].hex().upper()), 'wb') as pubkey_fh:
+            pubkey_fh.write(_make_rsa_transferable_key(signer_key, b'debops-keyring-test-signer'))
+        for (signee_sigs, expected_certified_by) in [
+            (certification, ['signer']),
+            (certification + revocation, []),
+        ]:
+            with open(os.path.join(tmp_keyring_dir, '0x' + signee_key['keyid'].hex().upper()), 'wb') as pubkey_fh:
+                pubkey_fh.write(_make_rsa_transferable_key(signee_key, signee_uid) + signee_sigs)
+            for backend_class in [GnuPGBackend, PythonBackend]:
+                debops_keyring = Keyring(
+                    keyring_name=tmp_keyring_dir,
+                    backend=backend_class.name,
+                )
+                debops_keyring._read_keyids_lines([
+                    '0x{} Signer <signer>'.format(signer_key['keyid'].hex().upper()),
+                    '0x{} Signee <signee>'.format(signee_key['keyid'].hex().upper()),
+                ], 'keyids')
+                graph = debops_keyring.read_certification_graph()
+                assert_equals(expected_certified_by, graph.get_certified_by('signee'))
+
+
+def test_certification_graph_certification_after_signer_expiry():
+    signer_key = _make_rsa_test_key(3)
+    signee_key = _make_rsa_test_key(4)
+    signee_uid = b'debops-keyring-test-signee'
+    with TemporaryDirectory() as tmp_keyring_dir:
+        with open(os.path.join(tmp_keyring_dir, '0x' + signer_key['keyid'].hex().upper()), 'wb') as pubkey_fh:
+            # Signer key expires 100 seconds after its creation.
+            pubkey_fh.write(_make_rsa_transferable_key(
+                signer_key, b'debops-keyring-test-signer',
+                hashed_subpackets=_openpgp_subpacket(9, (100).to_bytes(4, 'big')),
+            ))
+        for (certification_created, expected_certified_by) in [
+            (1500000050, ['signer']),
+            (1500000200, []),
+        ]:
+            certification = _rsa_signature_packet(
+                signer_key, 0x10, signee_key['hash_prefix'] + _uid_hash_data(signee_uid),
+                created=certification_created,
+            )
+            with open(os.path.join(tmp_keyring_dir, '0x' + signee_key['keyid'].hex().upper()), 'wb') as pubkey_fh:
+                pubkey_fh.write(_make_rsa_transferable_key(signee_key, signee_uid) + certification)
+            for backend_class in [GnuPGBackend, PythonBackend]:
+                debops_keyring = Keyring(
+                    keyring_name=tmp_keyring_dir,
+                    backend=backend_class.name,
+                )
+                debops_keyring._read_keyids_lines([
+                    '0x{} Signer <signer>'.format(signer_key['keyid'].hex().upper()),
+                    '0x{} Signee <signee>'.format(signee_key['keyid'].hex().upper()),
+                ], 'keyids')
+                graph = debops_keyring.read_certification_graph()
+                assert_equals(expected_certified_by, graph.get_certified_by('signee'), backend_class.name)
+
+
+def test_verify_git_history_flagged_signatures():
+    with TemporaryDirectory() as tmp_git_repo:
+        (git_cmd, tmp_keyring_dir, keyids_lines, role_lines, unknown_fingerprint) = \
+            _init_flagged_signatures_git_repo(tmp_git_repo)
+        _commit_new_file_content(git_cmd, tmp_git_repo, ['--gpg-sign', '--message', 'G'])
+
+        debops_keyring = Keyring(
+            keyring_name=tmp_keyring_dir,
+        )
+        report = debops_keyring.verify_git_history(tmp_git_repo)
+
+        gpg_check_home = os.path.join(tmp_git_repo, 'gpg_check_home')
+        os.mkdir(gpg_check_home, 0o700)
+        for long_key_id in os.listdir(tmp_keyring_dir):
+            subprocess.check_call(
+                ['gpg', '--homedir', gpg_check_home, '--batch', '--import', os.path.join(tmp_keyring_dir, long_key_id)],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            )
+        git_cmd.update_environment(GNUPGHOME=gpg_check_home)
+        commits = git_cmd.log('--format=%H %G?').split('\n')
+        signature_checks = [x.split(' ')[1] for x in commits]
+        # Good signature, the validity of the key is unknown without trust.
+        assert signature_checks[0] in ['G', 'U']
+        assert_equals(['R', 'X', 'Y', 'E'], signature_checks[1:])
+        commit_hashes = [x.split(' ')[0] for x in commits]
+        assert_equals(5, report['commits'])
+        assert_equals(1, report['verified'])
+        assert_equals([commit_hashes[1]], report['revoked_key'])
+        assert_equals([commit_hashes[2]], report['expired_signature'])
+        assert_equals([commit_hashes[3]], report['expired_key'])
+        assert_equals([commit_hashes[4]], report['unverified'])
+        assert_equals([], report['not_yet_valid'])